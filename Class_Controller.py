@@ -1,8 +1,9 @@
-from Class_SeaLevel import SeaLevel
-from Class_ElevationData import ElevationData
+from Class_Engine import SimulationEngine
 from Class_ProfileView import ProfileView
 from Class_CoordinateConverter import CoordinateConverter
 from Class_MainView import MainView
+from Class_Playback import Playback
+from Class_TaskRunner import TaskRunner
 
 class Controller:
 
@@ -13,13 +14,18 @@ class Controller:
         self.mainland_france = "fr_mainland.csv"
 
         #adding other classes
-        self.sea_level = SeaLevel()
+        # All the computations (sea level, elevation data, maps, refugees) are done by the engine, without tkinter
+        self.engine = SimulationEngine(self.world_elevation, self.mainland_france, self.mainland_france_contour)
         self.main_view = None
         self.secondary_view = None
         self.profile_view = ProfileView()
         self.coordinate_converter = CoordinateConverter()
-        self.elevation_data = ElevationData(self.world_elevation, self.mainland_france, self.mainland_france_contour)
+        self.task_runner = TaskRunner(max_workers=3)  # runs the map generation, the refugees computation, the exports and the pyramid in the background
         
+        #information for maps:
+        self.side = "top"       
+        self.playback = None    # animation of the map through the years (see play)
+
         # Create views here and inject controller
         self.main_view = MainView(self)
         self.secondary_view = self.main_view.secondary_view  # already created inside MainView
@@ -27,9 +33,24 @@ class Controller:
         # Link views to controller
         self.set_views(self.main_view, self.secondary_view)
 
-        #information for maps:
-        self.side = "top"       
-        self.reference_elevation = 0.21 #can only calculate refugees starting in 2022 (had elevation of 0.21m at that time)
+        # Build the pyramid of the zoomed views in the background, then draw the zoomed map again with it
+        self.task_runner.submit("pyramid", self.pyramid_ready, self.engine.load_pyramid)
+
+    def pyramid_ready(self, ready):
+        """
+        Redraw the map once the pyramid is loaded, so that a zoomed map shows its details.
+
+        Parameters
+        ----------
+        ready : bool
+            True if the pyramid is loaded
+
+        Returns
+        -------
+        None.
+        """
+        if ready and self.secondary_view.is_displayed():
+            self.secondary_view.redraw_scheduler.request()
 
     def set_views(self, mainview, secondaryview):
         """
@@ -61,28 +82,37 @@ class Controller:
 
     @property
     def sea_level_value(self):
-        return self.sea_level.retrieve_sea_level(
+        return self.engine.get_sea_level(
             self.chosen_year,
             self.main_view.get_ipcc_value())
         
                                                            
 
-    def count_refugees(self):
+    def count_refugees(self, callback, on_error=None):
         """
-        Compute the number of climatic refugees using the function compute_refugees from the class ElevationData, 
-        according to the year chosen by the user.
+        Compute the number of climatic refugees using the function count_refugees of the engine, 
+        according to the year chosen by the user. The computation runs in the background: a previous request
+        which has not finished yet is dropped.
+
+        Parameters
+        ----------
+        callback : function
+            called in the thread of the interface with the number of climatic refugees
+            (string in the form 'nb_refugees' millions)
+        on_error : function
+            called in the thread of the interface with the exception if the computation failed
 
         Returns
         -------
-        nb_refugees : string
-            number of climatic refugees in the form 'nb_refugees' millions.
+        None.
 
         """
-        nb_refugees = self.elevation_data.compute_refugees(self.chosen_year,
-                                                           self.sea_level_value,
-                                                           self.reference_elevation)
-                                                           
-        return nb_refugees
+        # The year and the sea level are read from the interface here, in the thread of the interface
+        self.task_runner.submit("refugees", callback,
+                                self.engine.count_refugees,
+                                self.chosen_year,
+                                self.sea_level_value,
+                                on_error=on_error)
 
     def top_or_side(self):
         """
@@ -101,43 +131,87 @@ class Controller:
         if self.side == "profile":  #The user wants to see the profile view of a specific country
             self.main_view.change_mode_value("profile")
             self.create_profile_map()
+            self.main_view.map_ready()
 
-    def create_top_map(self):
+    def create_top_map(self, preview=True):
         """
-        Create a map adapted to the user's choice (reuse of a function from SecondaryView)
+        Create a map adapted to the user's choice (reuse of a function from SecondaryView).
+        A low resolution preview is shown at once, then finer versions of the map are rendered in the background
+        and replace it as soon as they are ready (only for the latest request if the user changed the year
+        or the scenario in the meantime).
+
+        Parameters
+        ----------
+        preview : bool
+            if False, the map displayed stays until the finer versions are ready
 
         Returns
         -------
         None.
 
         """
-        # Clear old canvas if exists
-        for widget in self.main_view.frame_map.winfo_children():
-            widget.pack_forget()
+        width, height = self.map_size()
+        sea_level = self.sea_level_value
+
+        def show_top_map(base_image):
+            self.display_map(sea_level, base_image)
+            self.main_view.map_ready()
+
+        # Preview from the decimated grid (a few milliseconds), unless the map was already rendered
+        image = self.engine.cached_map(width, height, sea_level)
+        if image is not None:
+            # The map of an older request still rendering must not replace this one when it is ready
+            self.task_runner.cancel("map")
+            show_top_map(image)
+        elif preview:
+            show_top_map(self.engine.render_preview(width, height, sea_level))
+
+        if image is None:
+            self.task_runner.submit("map", show_top_map,
+                                    self.engine.render_progressive,
+                                    width,
+                                    height,
+                                    sea_level,
+                                    on_error=self.map_failed)
+
+    def map_failed(self, error):
+        """
+        Remove the loading label if the map could not be rendered, so that the user can try again.
 
-        self.secondary_view.create_map(self.frame,
-                                       self.width,
-                                       self.height,
-                                       self.sea_level_value)
-        self.side = "top" #Set the parameter to then display the general view of the map
-        self.main_view.change_mode_value("top")
+        Parameters
+        ----------
+        error : Exception
+            error raised while rendering the map
+
+        Returns
+        -------
+        None.
+        """
+        self.main_view.map_ready()
 
     def create_profile_map(self):
         """
-        Prepare and draw the profile view of a country for which it is available if the user has clicked on it.
+        Prepare and draw the profile view of a country for which it is available if the user has clicked on it,
+        or update the profile view if it is already displayed.
         
         Returns :
         ------- 
         None
         """
+        # The profile is already displayed: only update it for the sea level of the year, in the same canvas
+        if self.profile_displayed():
+            self.profile_view.set_sea_level(self.sea_level_value)
+            return
+
         #If the user has clicked on the a country for which the profile view is available
-        if self.elevation_data.test_if_point_in(self.get_where_clicked()):
+        if self.engine.is_in_profile_country(*self.get_where_clicked()):
             # Clear old ProfileView if exists
             for widget in self.main_view.frame_map.winfo_children():
                 widget.pack_forget()
 
-            # Prepare data: dictionary of elevation with respect to the longitude (for France only)
-            dico_per_long = self.elevation_data.build_dico_per_long(self.sea_level_value)
+            # Prepare data: dictionary of elevation with respect to the longitude (for France only),
+            # the sea level is only applied when the sea is drawn over it
+            dico_per_long = self.engine.build_profile()
 
 
             # Draw profile
@@ -152,6 +226,174 @@ class Controller:
 
 
 
+    def map_size(self):
+        """
+        Size of the frame of the map, or 800 x 600 if it is not available yet.
+
+        Returns
+        -------
+        tuple
+            (width, height) in pixels
+        """
+        if self.width <= 1 or self.height <= 1:
+            return 800, 600
+        return self.width, self.height
+
+    def play(self):
+        """
+        Start the animation of the map from the year chosen by the user to 2445, for the chosen scenario.
+        The frames are rendered in advance in the background (see Playback).
+
+        Returns
+        -------
+        None.
+        """
+        self.stop_playback()
+        width, height = self.map_size()
+        self.playback = Playback(self.engine, width, height,
+                                 self.main_view.get_ipcc_value(),
+                                 range(self.chosen_year, 2446, 5))
+        self.playback.start()
+
+    def stop_playback(self):
+        """
+        Stop the animation if it is running.
+
+        Returns
+        -------
+        None.
+        """
+        if self.playback is not None:
+            self.playback.stop()
+            self.playback = None
+
+    def map_displayed(self):
+        """
+        Check if the map of the Earth is displayed (top view) and not animated.
+
+        Returns
+        -------
+        bool
+            True if the map is displayed
+        """
+        return self.side == "top" and self.playback is None and self.secondary_view.is_displayed()
+
+    def profile_displayed(self):
+        """
+        Check if the profile view of a country is displayed.
+
+        Returns
+        -------
+        bool
+            True if the profile view is displayed
+        """
+        return self.side == "profile" and self.profile_view.is_displayed()
+
+    def preview_year(self, year):
+        """
+        Recolour the displayed map with a low resolution preview of a year for the chosen scenario
+        (see SimulationEngine.render_year_preview), while the slider of the years is dragged.
+        In the profile view, the profile is updated for the sea level of the year instead.
+
+        Parameters
+        ----------
+        year : int
+            year of the slider
+
+        Returns
+        -------
+        None.
+        """
+        if self.profile_displayed():
+            self.profile_view.set_sea_level(self.get_sea_level(year, self.main_view.get_ipcc_value()))
+            return
+        if not self.map_displayed():
+            return
+        width, height = self.map_size()
+        self.secondary_view.show_preview(self.engine.render_year_preview(width, height, year,
+                                                                         self.main_view.get_ipcc_value()))
+
+    def settle_year(self):
+        """
+        Render the map of the year of the slider in full quality, once the slider has stopped moving.
+
+        Returns
+        -------
+        None.
+        """
+        if self.map_displayed():
+            self.create_top_map(preview=False)
+
+    def show_frame(self, sea_level, image):
+        """
+        Display a frame of the animation (see display_map). A map still rendering in the background
+        for an older request is dropped, so that it does not replace the frame when it is ready.
+
+        Parameters
+        ----------
+        sea_level : float
+            sea level of the frame
+        image : PIL.Image
+            map rendered for this sea level
+
+        Returns
+        -------
+        None.
+        """
+        self.task_runner.cancel("map")
+        self.display_map(sea_level, image)
+
+    def display_map(self, sea_level, image):
+        """
+        Display an image of the map: it replaces the image of the map if it is displayed,
+        otherwise the map is created with it.
+
+        Parameters
+        ----------
+        sea_level : float
+            sea level of the map
+        image : PIL.Image
+            image of the map rendered for this sea level
+
+        Returns
+        -------
+        None.
+        """
+        if self.side == "top" and self.secondary_view.is_displayed():
+            self.secondary_view.show_base_image(image, sea_level)
+            self.secondary_view.redraw()
+            return
+
+        # Clear old canvas if exists
+        for widget in self.main_view.frame_map.winfo_children():
+            widget.pack_forget()
+        width, height = self.map_size()
+        self.secondary_view.create_map(self.frame, width, height, sea_level, image)
+        self.side = "top"
+        self.main_view.change_mode_value("top")
+
+    def export_animation(self, path, callback, on_error=None):
+        """
+        Save the animation of the chosen scenario from 1950 to 2445 in the background,
+        as an animated GIF or as PNG files (see Playback.export).
+
+        Parameters
+        ----------
+        path : str
+            name of the .gif file or of the folder of the PNG files
+        callback : function
+            called in the thread of the interface with the number of frames saved
+        on_error : function
+            called in the thread of the interface with the exception if the export failed
+
+        Returns
+        -------
+        None.
+        """
+        width, height = self.map_size()
+        playback = Playback(self.engine, width, height, self.main_view.get_ipcc_value(), range(1950, 2446, 5))
+        self.task_runner.submit("export", callback, playback.export, path, on_error=on_error)
+
     def get_where_clicked(self):
         """
         Retrieve the geographical coordinates (latitude and longitude) of a point from the x and y coordinates of the window
@@ -183,7 +425,7 @@ class Controller:
     
     def get_sea_level(self, year, scenario):
         """
-        Retrieve the sea level from the SeaLevel class and its functions
+        Retrieve the sea level from the engine (SeaLevel class and its functions)
 
         Parameters
         ----------
@@ -198,7 +440,7 @@ class Controller:
             Sea level for the corresponding year and scenario
 
         """
-        return self.sea_level.retrieve_sea_level(year, scenario)
+        return self.engine.get_sea_level(year, scenario)
     
     def run(self):
         """
@@ -208,6 +450,8 @@ class Controller:
         None
         """
         self.main_view.mainloop()
+        self.stop_playback()
+        self.task_runner.shutdown()
         
 if __name__ == "__main__":
     app_controller = Controller()
@@ -0,0 +1,330 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import netCDF4 as nc
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ElevationCache:
+    def __init__(self, netcdf_file, cache_dir=None, block_rows=512):
+        """
+        Binary cache of the arrays of the .nc elevation file (latitude, longitude and elevation),
+        stored as .npy files in a folder next to the .nc file so that they can be memory-mapped.
+        The elevations are stored as int16 (whole meters), which is 2 times smaller than the float32 of the .nc file.
+        The cache is rebuilt automatically when the .nc file changes (size, modification time or content).
+
+        Parameters
+        ----------
+        netcdf_file : str
+            name of the .nc file containing the latitude, longitude and elevation of all points on Earth
+        cache_dir : str
+            folder of the cache (by default, the name of the .nc file followed by '.cache')
+        block_rows : int
+            number of rows of the elevation grid decoded at once when the .nc file is not chunked
+        """
+        self.netcdf_file = netcdf_file
+        self.cache_dir = cache_dir if cache_dir is not None else netcdf_file + ".cache"
+        self.block_rows = block_rows
+
+        self.lats = None   # memory-mapped arrays, set by load()
+        self.lons = None
+        self.z = None
+
+    def chunk_rows(self, variable):
+        """
+        Number of rows read at once from the elevation variable: the height of a chunk of the .nc file
+        (a chunk is always decompressed entirely, so reading whole chunks avoids decompressing them twice),
+        or block_rows if the variable is not chunked.
+
+        Parameters
+        ----------
+        variable : netCDF4.Variable
+            elevation variable of the .nc file
+
+        Returns
+        -------
+        int
+            number of rows of a block
+        """
+        chunking = variable.chunking()
+        if chunking == 'contiguous' or chunking is None:
+            return self.block_rows
+        return max(1, int(chunking[0]))
+
+    @staticmethod
+    def to_int16(elevations):
+        """
+        Round elevations in meters read from the .nc file and convert them to int16, like in the cache.
+
+        Returns
+        -------
+        numpy array
+            elevations rounded to the nearest meter (int16)
+        """
+        return np.clip(np.rint(np.ma.getdata(elevations)), -32768, 32767).astype(np.int16)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def atomic_file(path):
+        """
+        Give a temporary name to write a file of the cache, and rename the file to path once it is complete
+        (at the end of the with block), so that a file whose build was interrupted is never used.
+        If the block raises an exception, the file is not renamed.
+
+        Parameters
+        ----------
+        path : str
+            name of the .npy file
+
+        Returns
+        -------
+        str
+            temporary name of the file, in the same folder
+        """
+        tmp_path = path + ".tmp.npy"
+        yield tmp_path
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def save_atomic(path, array):
+        """
+        Save an array as a .npy file of the cache (see atomic_file).
+
+        Parameters
+        ----------
+        path : str
+            name of the .npy file
+        array : numpy array
+            array to save
+
+        Returns
+        -------
+        None.
+        """
+        with ElevationCache.atomic_file(path) as tmp_path:
+            np.save(tmp_path, array)
+
+    @staticmethod
+    def uniform_slice(indices):
+        """
+        Convert sorted, evenly spaced indices into a slice (start:stop:step), so that netCDF4 reads them
+        as one strided hyperslab.
+
+        Parameters
+        ----------
+        indices : numpy array
+            increasing indices
+
+        Returns
+        -------
+        slice or None
+            the equivalent slice, None if the indices are not evenly spaced
+        """
+        if len(indices) == 1:
+            return slice(int(indices[0]), int(indices[0]) + 1)
+        steps = np.diff(indices)
+        if steps[0] > 0 and np.all(steps == steps[0]):
+            return slice(int(indices[0]), int(indices[-1]) + 1, int(steps[0]))
+        return None
+
+    def read_subset(self, lat_indices, lon_indices):
+        """
+        Read only the elevations at the rows lat_indices and the columns lon_indices of the grid
+        (the result is elevations[lat_indices[:, None], lon_indices[None, :]]).
+        If the cache is valid, the points are read from the memory-mapped cache. Otherwise the selection is
+        done in the .nc file: evenly spaced indices are read as one strided hyperslab, other indices by
+        blocks of rows aligned on the chunks of the file, keeping only the needed rows and columns of each block.
+        In both cases, the whole grid is never loaded in memory.
+
+        Parameters
+        ----------
+        lat_indices : numpy array
+            indices of the rows (latitudes) to read, in any order
+        lon_indices : numpy array
+            indices of the columns (longitudes) to read, in any order
+
+        Returns
+        -------
+        numpy array
+            2D array (len(lat_indices) x len(lon_indices)) of the elevations in meters (int16)
+        """
+        lat_indices = np.asarray(lat_indices, dtype=np.intp)
+        lon_indices = np.asarray(lon_indices, dtype=np.intp)
+
+        if self.z is not None or self.is_valid():
+            _, _, z = self.load()
+            return np.asarray(z[lat_indices[:, None], lon_indices[None, :]])
+
+        # Distinct sorted indices, and position of each requested index among them
+        rows, row_pos = np.unique(lat_indices, return_inverse=True)
+        cols, col_pos = np.unique(lon_indices, return_inverse=True)
+
+        with nc.Dataset(self.netcdf_file, mode='r') as dataset:
+            elevations = dataset.variables['z']
+            row_slice = self.uniform_slice(rows)
+            col_slice = self.uniform_slice(cols)
+
+            if row_slice is not None and col_slice is not None:
+                # One strided hyperslab
+                subset = self.to_int16(elevations[row_slice, col_slice])
+            else:
+                # Blocks of rows aligned on the chunks, only between the first and the last needed column
+                subset = np.empty((len(rows), len(cols)), dtype=np.int16)
+                block_rows = self.chunk_rows(elevations)
+                blocks = rows // block_rows
+                for block in np.unique(blocks):
+                    in_block = np.nonzero(blocks == block)[0]
+                    start = int(block * block_rows)
+                    stop = min(start + block_rows, elevations.shape[0])
+                    data = elevations[start:stop, int(cols[0]):int(cols[-1]) + 1]
+                    subset[in_block] = self.to_int16(data[rows[in_block] - start][:, cols - cols[0]])
+
+        return subset[row_pos[:, None], col_pos[None, :]]
+
+    def read_axes(self):
+        """
+        Return the latitude and longitude arrays, from the cache if it is valid, otherwise from the .nc file.
+
+        Returns
+        -------
+        lats : numpy array
+            1D array of the latitudes in degrees
+        lons : numpy array
+            1D array of the longitudes in degrees
+        """
+        if self.z is not None or self.is_valid():
+            lats, lons, _ = self.load()
+            return lats, lons
+        with nc.Dataset(self.netcdf_file, mode='r') as dataset:
+            lats = np.ma.getdata(dataset.variables['lat'][:]).astype(np.float64)
+            lons = np.ma.getdata(dataset.variables['lon'][:]).astype(np.float64)
+        return lats, lons
+
+    def file_hash(self):
+        """
+        Compute the SHA-256 hash of the content of the .nc file, reading it by blocks of 1 MB.
+
+        Returns
+        -------
+        str
+            hexadecimal hash of the file
+        """
+        sha = hashlib.sha256()
+        with open(self.netcdf_file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def source_key(self):
+        """
+        Describe the current .nc file by its size and modification time.
+
+        Returns
+        -------
+        dict
+            {'size': size in bytes, 'mtime': modification time in nanoseconds}
+        """
+        stat = os.stat(self.netcdf_file)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def is_valid(self):
+        """
+        Check if the cache corresponds to the current .nc file.
+        The size and the modification time are compared first. If they changed, the hash of the content is computed:
+        if the content is the same (the file was only copied or touched), the key of the cache is updated,
+        otherwise the cache is not valid anymore.
+
+        Returns
+        -------
+        bool
+            True if the cache can be used, False if it has to be rebuilt
+        """
+        key_file = os.path.join(self.cache_dir, "key.json")
+        try:
+            with open(key_file, 'r', encoding='utf-8') as f:
+                key = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        current = self.source_key()
+        if key.get('size') == current['size'] and key.get('mtime') == current['mtime']:
+            return True
+
+        # Size or modification time changed: only the content can tell if the cache is still valid
+        if key.get('size') != current['size'] or key.get('sha256') != self.file_hash():
+            return False
+
+        key.update(current)
+        with open(key_file, 'w', encoding='utf-8') as f:
+            json.dump(key, f)
+        return True
+
+    def build(self):
+        """
+        Decode the .nc file and write the cache: lat.npy, lon.npy and z.npy (int16), then key.json.
+        The elevation grid is read by blocks of rows so that the whole float32 grid is never in memory.
+        The cache is written in a temporary folder which replaces the old cache only once complete.
+
+        Returns
+        -------
+        None.
+        """
+        tmp_dir = self.cache_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        key = self.source_key()
+        key['sha256'] = self.file_hash()
+
+        with nc.Dataset(self.netcdf_file, mode='r') as dataset:
+            np.save(os.path.join(tmp_dir, "lat.npy"), np.ma.getdata(dataset.variables['lat'][:]).astype(np.float64))
+            np.save(os.path.join(tmp_dir, "lon.npy"), np.ma.getdata(dataset.variables['lon'][:]).astype(np.float64))
+
+            elevations = dataset.variables['z']
+            z = np.lib.format.open_memmap(os.path.join(tmp_dir, "z.npy"), mode='w+',
+                                          dtype=np.int16, shape=elevations.shape)
+
+            # Decode and round the grid block by block (blocks aligned on the chunks of the .nc file)
+            block_rows = self.chunk_rows(elevations)
+            for start in range(0, elevations.shape[0], block_rows):
+                stop = min(start + block_rows, elevations.shape[0])
+                z[start:stop] = self.to_int16(elevations[start:stop, :])
+            z.flush()
+            del z
+
+        # The key is written last: a cache without key is never used
+        with open(os.path.join(tmp_dir, "key.json"), 'w', encoding='utf-8') as f:
+            json.dump(key, f)
+
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.rename(tmp_dir, self.cache_dir)
+        logger.info("Cache of %s built in %s", self.netcdf_file, self.cache_dir)
+
+    def load(self):
+        """
+        Return the latitude, longitude and elevation arrays of the .nc file, memory-mapped from the cache
+        (no copy, the pages of the files are only read when used). Build the cache first if it is missing
+        or if the .nc file changed.
+
+        Returns
+        -------
+        lats : numpy array
+            1D array of the latitudes in degrees
+        lons : numpy array
+            1D array of the longitudes in degrees
+        z : numpy array
+            2D array (lat x lon) of the elevations in meters (int16, read-only)
+        """
+        if self.z is None:
+            if not self.is_valid():
+                self.build()
+            self.lats = np.load(os.path.join(self.cache_dir, "lat.npy"), mmap_mode='r')
+            self.lons = np.load(os.path.join(self.cache_dir, "lon.npy"), mmap_mode='r')
+            self.z = np.load(os.path.join(self.cache_dir, "z.npy"), mmap_mode='r')
+        return self.lats, self.lons, self.z
@@ -1,23 +1,48 @@
-import netCDF4 as nc
+import hashlib
+import logging
+import os
+
+import numpy as np
+import shapely
 from shapely.geometry import Polygon, Point, MultiPoint
 import pandas as pd
 
+from Class_ElevationCache import ElevationCache
+from Class_ElevationIndex import ElevationIndex
+from Class_FloodLevel import FloodLevel
+
+logger = logging.getLogger(__name__)
+
+
 class ElevationData:
 
-    def __init__(self, world_map, country_map, contour_map,):
+    def __init__(self, world_map, country_map, contour_map, step=5):
 
        self.netcdf_files  = world_map
+       self.step = step   # keep one point every step points of the .nc file
+       self.elevation_cache = ElevationCache(world_map)  # memory-mapped arrays of the .nc file
+       self.flood_level = FloodLevel(self.elevation_cache, step)  # lowest sea level at which the ocean reaches each point
        self.contour_map = contour_map
        self.country_map = country_map
        
-       self.elevation_dict = {} # Initialize an empty dictionary: { elevation → [[lat, lon], ...] }
+       self.elevation_index = None # Points sorted by elevation (ElevationIndex), used for the queries per level
        self.polygon = None
+       self.continents = []       # Names of the continents, in the order of the columns of cumulative_area
+       self.continent_labels = None # Number of the continent of each point of the grid (see create_continent_labels)
+       self.grid_shape = None     # (number of latitudes, number of longitudes) of the decimated grid
+       self.cell_area = None      # Area in km squared of a point of each row of the grid (see create_cell_area)
+       self.duplicate_column = False # True if the last column of the grid is the first one again (-180° = 180°)
+       self.cumulative_area = None # Area below each level for each continent (see create_cumulative_area)
+       self.profile_longitudes = None # Longitudes of the profile of the country, rounded to 0.1 degree (see create_profile)
+       self.profile_elevations = None # Average elevation of the country at each of these longitudes
        #self.dict_test = {50: [[-80, 90], [65.234114, 100.368612]], 49: [[-80, 90], [65.234114, 100.368612]], 899: [[-80, 90], [65.234114, 100.368612]], -1000: [[-80, 90], [65.234114, 100.368612]]}
        #self.dict_test = dict(list(self.elevation_dict.items())[5:])
        
        #methods
        self.create_polygon(self.contour_map)
        self.create_elevation()
+       self.create_cell_area()
+       self.create_cumulative_area()
        self.climate_features = {'drought_index': 1.0,'flood_risk': 1.0, 'heatwave_days': 10, 'wildfire_risk': 1.0}
        self.nb_refugees = self.compute_refugees(2030,50,0.21)
        #print(self.nb_refugees)            
@@ -25,60 +50,41 @@ class ElevationData:
     def create_elevation(self):
         
         """
-        Load the data from a .nc file containing the elevation, longitude and altitude of all points on Earth 
-        (with a precision to the 60 arc-minute). Convert the data to create a dictionary with the key being an
-        elevation and the value a list of tuples (latitude, longitude), in degrees, of all points being at the 
-        given elevation (in meters).
-
-        elevation_dico = { “elevation1” : [ [lat1, long1], [lat2, long2], …],
-                          evation2” : [ [lat1, long1], [lat2, long2], …],...}
+        Load the elevations of all points on Earth from the binary cache of the .nc file (with a precision
+        to the 60 arc-minute), keeping one point every step points, and index the points of the grid sorted
+        by elevation (see ElevationIndex). The elevation of a point is its flood level (see FloodLevel):
+        the lowest sea level at which the ocean reaches it.
+        
+        The whole decimated grid is rounded and sorted at once with numpy instead of 
+        looping over every point in python.
                           
         Parameters: 
             -------
-            self.netcdf_files: string
-            corresponding to the name of the .nc file containing the data for the latitude, longitude and elevation of all points on Earth.
+            self.elevation_cache: ElevationCache
+            binary cache of the .nc file containing the data for the latitude, longitude and elevation of all points on Earth.
+            self.step: int
+            only one point every step points (in latitude and in longitude) is kept.
 
         Returns:
             -------
-            elevation_dict: dict
-            associates each elevation in meters to a list of tuples (latitude, longitude) in degrees at the given elevation.
+            elevation_index: ElevationIndex
+            positions in the grid and elevations in meters of the points, sorted by elevation.
         """
 
-        
+        # Use the flood level of each point instead of its elevation: a point is only submerged when the ocean
+        # reaches it, so the inland depressions (Caspian Sea, Dead Sea...) below sea level stay dry
+        # (with step = 5 on the 60 arc-second file, we keep one point every 5 arc-minutes)
+        elevations = self.flood_level.load()
+        self.grid_shape = elevations.shape
 
-        # Read the NetCDF file
-        with nc.Dataset(self.netcdf_files, mode='r') as dataset:
-            # Read the latitude and longitude arrays of the NetCDF file
-            lats = dataset.variables['lat'][:]
-            lons = dataset.variables['lon'][:]
+        # Round all the values at once (np.rint rounds half to even, like the built-in round)
+        elevs = np.rint(elevations).astype(int).ravel()
 
-            # Read the elevation matrix (2D array: lat x lon)
-            elevations = dataset.variables['z'][:]
+        # Index the points sorted by elevation, to find all the points in an interval of elevation with binary searches
+        # and to sum their areas per level (see create_cumulative_area)
+        self.elevation_index = ElevationIndex(elevs)
 
-            
-            # Define the step of the array to have a 5° resolution
-            # Convert the 60 arc-minute resolution :
-            # Given that 1°= 60 arc-minute, 5° = 300 arc-mintues
-            # So keep every 5nd point
-            step = 5
-
-            # Get indices that will give us data at 0.5° spacing
-            lat_indices = list(range(0, len(lats), step))
-            lon_indices = list(range(0, len(lons), step))
-
-            # Loop through selected lat/lon lists
-            for i in lat_indices:
-                for j in lon_indices:
-                    lat = round(float(lats[i]))
-                    lon = round(float(lons[j]))
-                    elev = round(float(elevations[i, j]))  
-
-                    # Initialize list for this elevation if it doesn't exist
-                    if elev not in self.elevation_dict:
-                        self.elevation_dict[elev] = []
-
-                        # Add the coordinate pair [lat, lon] to the elevation_dict dictionary at index elevation (elev)
-                        self.elevation_dict[elev].append([lat, lon])
+        return self.elevation_index
 
             
     
@@ -139,11 +145,51 @@ class ElevationData:
 
                 
             
+    def create_profile(self):
+        """
+        Read the csv file of France mainland elevation points once and compute the average elevation
+        of the points at each longitude (rounded to 1 decimal), stored as two numpy arrays sorted by longitude.
+        Only called the first time a profile is needed (see profile_per_long and build_dico_per_long).
+
+        Returns
+        -------
+        profile_longitudes : numpy array
+            longitudes rounded to 0.1 degree (float)
+        profile_elevations : numpy array
+            average elevation in meters of the points at each longitude (float)
+        """
+        coordinates = pd.read_csv(self.country_map, encoding='utf-8', delimiter=",")
+
+        # round longitude to 1 decimal place
+        longitudes = coordinates['longitude'].to_numpy(dtype=float).round(1)
+        elevations = coordinates['elevation'].to_numpy(dtype=float)
+
+        # compute average elevation per longitude
+        self.profile_longitudes, groups = np.unique(longitudes, return_inverse=True)
+        self.profile_elevations = (np.bincount(groups, weights=elevations)
+                                   / np.bincount(groups, minlength=len(self.profile_longitudes)))
+        return self.profile_longitudes, self.profile_elevations
+
+    def profile_per_long(self):
+        """
+        Creates a dictionary where each key is a longitude (rounded to 1 decimal) and the value is the average
+        elevation at that longitude (rounded to the meter), without applying any sea level.
+
+        Returns
+        -------
+        dict
+            Dictionary of the form {longitude_rounded : avg_elevation}
+        """
+        if self.profile_longitudes is None:
+            self.create_profile()
+
+        return dict(zip(self.profile_longitudes.tolist(), np.round(self.profile_elevations).astype(int).tolist()))
+
     def build_dico_per_long(self, sea_level):
         """
-        Reads a csv file of France mainland elevation points and creates a dictionary
-        where each key is a longitude (rounded to 1 decimal) and the value is the average
+        Creates a dictionary where each key is a longitude (rounded to 1 decimal) and the value is the average
         elevation above sea level at that longitude (only if it is above sea level).
+        The averages are computed once (see create_profile): only the sea level is subtracted here.
     
         Parameters
         ----------
@@ -156,40 +202,199 @@ class ElevationData:
             Dictionary of the form {longitude_rounded : avg_elevation_above_sea_level}
             Only includes longitudes where the average elevation is above the sea level.
         """
-        coordinates = pd.read_csv(self.country_map, encoding='utf-8', delimiter=",")
-
-        # round longitude to 1 decimal place
-        coordinates['longitude'] = coordinates['longitude'].round(1)
-
-        # compute average elevation per longitude
-        grouped = coordinates.groupby('longitude')['elevation'].mean()
+        if self.profile_longitudes is None:
+            self.create_profile()
 
         # filter based on the sea level
-        dico_per_long = {}
-        for lon, avg_elev in grouped.items():
-            if avg_elev > sea_level:
-                adjusted_elev = round(avg_elev - sea_level)
-                dico_per_long[lon] = adjusted_elev
+        above = self.profile_elevations > sea_level
+        adjusted_elev = np.round(self.profile_elevations[above] - sea_level).astype(int)
 
-        return dico_per_long
+        return dict(zip(self.profile_longitudes[above].tolist(), adjusted_elev.tolist()))
     
         
+    def create_continent_polygons(self):
+        """
+        Define the limits of the continents considering a polygon containing the whole continent, including sea borders.
+        Store the limit coordinates in lists of tuples (long, lat) to have a closed polygon.
+        The order of the dictionary is the order in which a point is tested: a point in two polygons
+        belongs to the first one.
+
+        Returns
+        -------
+        continent_polygons : dict
+            associates the name of each continent to its polygon (shapely.geometry.Polygon)
+        """
+        # Define the limits of each continent and create polygons with these limits
+        limits_asia = [[30.0, 80.0], [180.0, 80.0], [180.0, -15.0], [130.0, -15.0], [90.0, -20.0], [50.0, -20.0], [30.0, 0.0], [20.0, 10.0], [20.0, 40.0], [30.0, 80.0]]
+        limits_africa = [[-30.0, 40.0], [60.0, 40.0], [60.0, -40.0], [20.0, -50.0], [-30.0, -40.0], [-30.0, 0.0], [-30.0, 40.0]]
+        limits_namerica = [[-170.0, 85.0], [-30.0, 85.0], [-30.0, 10.0], [-60.0, 5.0], [-100.0, 5.0], [-170.0, 10.0], [-170.0, 85.0]]
+        limits_samerica = [-90.0, 15.0], [-30.0, 15.0], [-30.0, -60.0], [-90.0, -60.0], [-90.0, 15.0]
+        limits_europe = [-30.0, 75.0], [60.0, 75.0], [60.0, 35.0], [30.0, 30.0], [0.0, 30.0], [-30.0, 40.0], [-30.0, 75.0]
+        limits_oceania = [[110.0, 0.0], [180.0, 0.0], [180.0, -50.0], [110.0, -50.0], [110.0, 0.0]]
+
+        # Create the polygons that approximate the shape of each continent
+        continent_polygons = {'asia': MultiPoint(limits_asia).convex_hull,
+                              'africa': MultiPoint(limits_africa).convex_hull,
+                              'namerica': MultiPoint(limits_namerica).convex_hull,
+                              'samerica': MultiPoint(limits_samerica).convex_hull,
+                              'europe': MultiPoint(limits_europe).convex_hull,
+                              'oceania': MultiPoint(limits_oceania).convex_hull}
+        return continent_polygons
+
+    def create_cell_area(self):
+        """
+        Compute the area in km squared covered by a point of the decimated grid, for each row (latitude) of the grid.
+        A point covers a cell of the sphere between two meridians and two parallels: its area is
+        R^2 * (width in longitude in radians) * (sin(north limit) - sin(south limit)), so the cells get smaller
+        towards the poles. All the points of a row have the same area, so one value per row is enough and it is
+        broadcast across the grid when the areas are summed.
+
+        Returns
+        -------
+        cell_area : numpy array
+            area in km squared of a point of each row of the grid
+        """
+        earth_radius = 6371.0088  # mean radius of the Earth in kilometers
+
+        lats, lons, _ = self.elevation_cache.load()
+        lats = np.asarray(lats[::self.step], dtype=np.float64)
+        lons = np.asarray(lons[::self.step], dtype=np.float64)
+
+        # Size of a cell in degrees (the grid is regular)
+        d_lat = abs(lats[1] - lats[0]) if len(lats) > 1 else 180.0
+        d_lon = abs(lons[1] - lons[0]) if len(lons) > 1 else 360.0
+
+        # Limits of the cell of each row, which do not go beyond the poles
+        south = np.radians(np.clip(lats - d_lat / 2, -90, 90))
+        north = np.radians(np.clip(lats + d_lat / 2, -90, 90))
+
+        self.cell_area = earth_radius ** 2 * np.radians(d_lon) * (np.sin(north) - np.sin(south))
+
+        # If the grid goes from -180° to 180° included, its last column covers the same points as the first one
+        self.duplicate_column = bool(len(lons) > 1 and np.isclose(lons[-1] - lons[0], 360.0))
+        return self.cell_area
+
+    def create_continent_labels(self):
+        """
+        Rasterise the polygons of the continents once onto the decimated elevation grid: each point gets
+        the number of its continent (position in self.continents), or 255 if it is in no continent.
+        A point in two polygons belongs to the first one (see create_continent_polygons).
+        The raster is stored as a .npy file (uint8) in the folder of the cache. The name of the file contains
+        a hash of the polygons, so the raster is computed again if the limits of the continents change.
+
+        Returns
+        -------
+        continent_labels : numpy array
+            2D array (uint8) of the number of the continent of each point (memory-mapped)
+        """
+        polygons = self.create_continent_polygons()
+        self.continents = list(polygons.keys())
+
+        key = hashlib.sha1(b"".join(shapely.to_wkb(polygon) for polygon in polygons.values())).hexdigest()[:12]
+        path = os.path.join(self.elevation_cache.cache_dir, f"continent_labels_{self.step}_{key}.npy")
+
+        if not os.path.exists(path):
+            lats, lons, _ = self.elevation_cache.load()
+            grid_lons, grid_lats = np.meshgrid(lons[::self.step], lats[::self.step])
+
+            # Test all the points at once for each polygon,
+            # only the points not already in a continent can be added to this one
+            labels = np.full(grid_lons.shape, 255, dtype=np.uint8)
+            for number, polygon in enumerate(polygons.values()):
+                shapely.prepare(polygon)
+                inside = (labels == 255) & shapely.contains_xy(polygon, grid_lons, grid_lats)
+                labels[inside] = number
+
+            ElevationCache.save_atomic(path, labels)
+            logger.info("Continent labels of shape %s built", labels.shape)
+
+        self.continent_labels = np.load(path, mmap_mode='r')
+        return self.continent_labels
+
+    def create_cumulative_area(self):
+        """
+        Precompute, once, the area in km squared of the points below each elevation for each continent.
+        The continent of each point and the surface covered by each point (smaller towards the poles,
+        see create_cell_area) never change, so the
+        area submerged between two sea levels is then the difference between two rows of the table.
+        The last column of the grid is not counted if it is the first one again (see create_cell_area).
+        The points of the inland depressions below sea level (Caspian Sea, Dead Sea...) are not counted:
+        they are mostly the beds of lakes, and they were counted as already under water in 2022 before
+        the flood levels were used, so flooding them does not add refugees.
+
+        cumulative_area[i, c] = area of the points of continent c with an elevation < elevation_index.levels[i]
+        (the last row contains the area of all the points of the continent).
+
+        Returns
+        -------
+        cumulative_area : numpy array
+            array of shape (number of levels + 1, number of continents)
+        """
+        # Number of the continent of each point (len(continents) if it is in no continent),
+        # in the order of the points of the index
+        labels = np.asarray(self.create_continent_labels()).ravel()[self.elevation_index.cells]
+        labels = np.minimum(labels, len(self.continents)).astype(np.intp)
+
+        # Number of the elevation level of each point (the points of the index are sorted by elevation)
+        levels = self.elevation_index.levels
+        level_numbers = np.searchsorted(levels, self.elevation_index.elevations)
+
+        # Area covered by each point, from the area of the points of its row (see create_cell_area)
+        surface = self.cell_area[self.elevation_index.cells // self.grid_shape[1]]
+        surface[self.flood_level.basins.ravel()[self.elevation_index.cells]] = 0
+
+        # The column at 180° is the same as the one at -180°: it is only counted once
+        if self.duplicate_column:
+            surface[self.elevation_index.cells % self.grid_shape[1] == self.grid_shape[1] - 1] = 0
+
+        # Sum the surface of the points per (level, continent), the last column counts the points in no continent
+        nb_columns = len(self.continents) + 1
+        area = np.bincount(level_numbers * nb_columns + labels,
+                           weights=surface,
+                           minlength=len(levels) * nb_columns)
+        area = area.reshape(len(levels), nb_columns)[:, :-1]
+
+        # Cumulate the area along the levels, starting with 0 below the lowest level
+        self.cumulative_area = np.zeros((len(levels) + 1, len(self.continents)))
+        np.cumsum(area, axis=0, out=self.cumulative_area[1:])
+
+        return self.cumulative_area
+
+    def submerged_area(self, elevation_low, elevation_high):
+        """
+        Compute the area in km squared of the points with elevation_low <= elevation < elevation_high
+        for each continent. The levels of the interval are found with two binary searches in the index
+        (see ElevationIndex.level_bounds) and the area is the difference between two rows of the table cumulative_area.
+        Summing the area of the points given by elevation_index.query_cells gives the same result,
+        but in a time proportional to the number of points of the interval.
+
+        Parameters
+        ----------
+        elevation_low : float
+            lowest elevation in meters (included)
+        elevation_high : float
+            highest elevation in meters (excluded)
+
+        Returns
+        -------
+        area : numpy array
+            area in km squared for each continent, in the order of self.continents
+        """
+        start, stop = self.elevation_index.level_bounds(elevation_low, elevation_high)
+        return np.maximum(self.cumulative_area[stop] - self.cumulative_area[start], 0)
+
     def compute_refugees(self, year, elevation_year, elevation_2022):
         """
         Compute the number of climatic refugees due to the elevation of sea level.
-        Define the limits of the continents considering a polygon containing the whole continent, including sea borders.
-        Store the limit coordinates in lists of tuples (lat, long) in order north, east, south and west to have a closed polygon.
         Initialize the number of refugees known in 2022.
         For each continent define an average population density and store it in a dictionary associating a continent name to a density.
         Define a dictionary associating to a continent's name the annual population growth to adjust the average population density according to the year.
-        Define the surface in km squared covered by a point on the dictionary eleavtion_dict as the product of one degree in latitude and one in longitude
-        converted in kilometer times 25 since we have a 5° resolution.
         At the year chosen by the user (limited to 500 years after 2022 to avoid unrealistic projections), compute the corresponding
         population density for each continent.
-        If the user chooses a year in the future, for each point in elevation_dict, if the point have been submerged,
-        computes the number of refugees due to sea level rise by multiplying the surface submerged by the population density of the continent.
-        To check if a point has been submerged, we check that it is below sea level in the year chosen by the user,
-        but was above sea level in 2022.
+        If the user chooses a year in the future, the area submerged on each continent is read in the table cumulative_area
+        (precomputed by create_cumulative_area) and the number of refugees due to sea level rise is the sum of the 
+        area submerged on each continent multiplied by the population density of the continent.
+        A point has been submerged if it is below sea level in the year chosen by the user, but was above sea level in 2022.
         Then add the refugees due to other climatic events using the function estimate_other_climatic_refugees.
         Parameters: 
          -------
@@ -204,80 +409,17 @@ class ElevationData:
             nb_refugees: (int) number of climatic refugees according to the year chosen by the user and the scenario.
         """
         nb_refugees = 32000000   #initialize the number of climatic refugees to 32 million in 2022
-        one_deg_lat = 111.320   #conversion of one degree in latitude into a distance in kilometers
-        one_deg_long = 111.320  #conversion of one degree in longitude into a distance in kilometers
     
-    
-        # # Define the base average inhabitant density for each continent in number of inhabitants per squared kilometer in 2022
-        base_density = {'asia': 149.7,'africa': 47.2,'america': 33.7,'europe': 109.0,'oceania': 5.2}
-
-        # Annual population growth rates per continent 
-        growth_rate = {'asia': 0.006,'africa': 0.025,'america': 0.007,'europe': 0.003, 'oceania': 0.012}
-
-        # Calculate how many years have passed since 2022 (no negative years)
-        years_since_2022 = max(0, year - 2022)
-        # If the user puts a year too far in the future, we limit it to 500 year, since models are not valid anymore after that
-        # It avoids unrealistic population densities due to the exponential growth of the population
-        if year - 2022 > 500:
-            years_since_2022 = 500
-    
-        # Compute projected population densities
-        density_asia = base_density['asia'] * (1 + growth_rate['asia']) ** years_since_2022
-        density_africa = base_density['africa'] * (1 + growth_rate['africa']) ** years_since_2022
-        density_america = base_density['america'] * (1 + growth_rate['america']) ** years_since_2022
-        density_europe = base_density['europe'] * (1 + growth_rate['europe']) ** years_since_2022
-        density_oceania = base_density['oceania'] * (1 + growth_rate['oceania']) ** years_since_2022
-    
-    
-        # Define the limits of each continent and create polygons with these limits
-        limits_asia = [[30.0, 80.0], [180.0, 80.0], [180.0, -15.0], [130.0, -15.0], [90.0, -20.0], [50.0, -20.0], [30.0, 0.0], [20.0, 10.0], [20.0, 40.0], [30.0, 80.0]]
-        polygon_asia = MultiPoint(limits_asia).convex_hull  # Create the polygon that approximates Asia's shape
-    
-        limits_africa = [[-30.0, 40.0], [60.0, 40.0], [60.0, -40.0], [20.0, -50.0], [-30.0, -40.0], [-30.0, 0.0], [-30.0, 40.0]]
-        polygon_africa = MultiPoint(limits_africa).convex_hull
-    
-        limits_namerica = [[-170.0, 85.0], [-30.0, 85.0], [-30.0, 10.0], [-60.0, 5.0], [-100.0, 5.0], [-170.0, 10.0], [-170.0, 85.0]]
-        polygon_namerica = MultiPoint(limits_namerica).convex_hull
-    
-        limits_samerica = [-90.0, 15.0], [-30.0, 15.0], [-30.0, -60.0], [-90.0, -60.0], [-90.0, 15.0]
-        polygon_samerica = MultiPoint(limits_samerica).convex_hull
-    
-        limits_europe = [-30.0, 75.0], [60.0, 75.0], [60.0, 35.0], [30.0, 30.0], [0.0, 30.0], [-30.0, 40.0], [-30.0, 75.0]
-        polygon_europe = MultiPoint(limits_europe).convex_hull
-    
-        limits_oceania = [[110.0, 0.0], [180.0, 0.0], [180.0, -50.0], [110.0, -50.0], [110.0, 0.0]]
-        polygon_oceania = MultiPoint(limits_oceania).convex_hull
-        
-        # Approximate surface covered by one point in the dictionary elevation_dict
-        surface = 5 * one_deg_lat * 5 * one_deg_long
+        # Projected population densities in the chosen year, in the order of self.continents
+        densities = self.population_densities([year])[0]
         
         if year > 2022:  # Check if the user chose a year in the future
-            for elev, list_points in self.elevation_dict.items():
     
-                # Loop through all elevation levels between the 2022 level and the level in the chosen future year
-                if elev < elevation_year and elev >= elevation_2022:
-                    for coord in list_points: 
-                        point = Point(coord[1], coord[0])  # Create a point with longitude first (x), then latitude (y)
-                        
-                        # Check which continent the point belongs to and compute number of refugees
-                        if polygon_asia.contains(point):
-                            # Add number of refugees based on population density and affected area
-                            nb_refugees += density_asia * surface
-                            
-                        elif polygon_africa.contains(point):
-                            nb_refugees += density_africa * surface
-                            
-                        elif polygon_namerica.contains(point):                            
-                            nb_refugees += density_america * surface
-                            
-                        elif polygon_samerica.contains(point):                            
-                            nb_refugees += density_america * surface
-                            
-                        elif polygon_europe.contains(point):                            
-                            nb_refugees += density_europe * surface
-                            
-                        elif polygon_oceania.contains(point):                            
-                            nb_refugees += density_oceania * surface
+            # Area submerged on each continent between the 2022 level and the level in the chosen future year
+            area = self.submerged_area(elevation_2022, elevation_year)
+
+            # Add number of refugees based on population density and affected area
+            nb_refugees += float(np.dot(densities, area))
                             
             other_refugees = self.estimate_other_climatic_refugees(year)
             nb_refugees += other_refugees
@@ -294,6 +436,85 @@ class ElevationData:
     
 
                     
+    def population_densities(self, years):
+        """
+        Project the average population density of each continent for each year of an array.
+        The densities known in 2022 grow with the annual population growth of each continent,
+        for at most 500 years after 2022 (the models are not valid anymore after that).
+
+        Parameters
+        ----------
+        years : numpy array
+            years at which the densities are projected
+
+        Returns
+        -------
+        densities : numpy array
+            array of shape (number of years, number of continents) of densities in inhabitants per km squared,
+            in the order of self.continents
+        """
+        # # Define the base average inhabitant density for each continent in number of inhabitants per squared kilometer in 2022
+        base_density = {'asia': 149.7,'africa': 47.2,'america': 33.7,'europe': 109.0,'oceania': 5.2}
+
+        # Annual population growth rates per continent 
+        growth_rate = {'asia': 0.006,'africa': 0.025,'america': 0.007,'europe': 0.003, 'oceania': 0.012}
+
+        # Calculate how many years have passed since 2022 (no negative years)
+        # If the user puts a year too far in the future, we limit it to 500 year, since models are not valid anymore after that
+        # It avoids unrealistic population densities due to the exponential growth of the population
+        years_since_2022 = np.clip(np.asarray(years) - 2022, 0, 500)
+
+        # Both Americas share the same density
+        population = {'asia': 'asia', 'africa': 'africa', 'namerica': 'america', 'samerica': 'america', 'europe': 'europe', 'oceania': 'oceania'}
+        base = np.array([base_density[population[continent]] for continent in self.continents])
+        growth = np.array([growth_rate[population[continent]] for continent in self.continents])
+        return base * (1 + growth) ** years_since_2022[:, None]
+
+    def project_refugees(self, years, scenarios, sea_level, elevation_2022=0.21):
+        """
+        Compute the number of climatic refugees for all the years and all the scenarios at once,
+        in the same way as compute_refugees. The sea levels of all the (year, scenario) pairs are looked up
+        together in the table cumulative_area, so the whole projection is a few array operations
+        instead of one call of compute_refugees per pair.
+
+        Parameters
+        ----------
+        years : numpy array
+            years of the projection (for example every 5 years from 1950 to 2445)
+        scenarios : list
+            IPCC scenarios of the projection
+        sea_level : SeaLevel
+            sea level of each year for each scenario
+        elevation_2022 : float
+            sea level elevation in 2022
+
+        Returns
+        -------
+        refugees : numpy array
+            array of shape (number of years, number of scenarios, number of continents) of the refugees
+            due to the sea level rise on each continent, in the order of self.continents
+        total : numpy array
+            array of shape (number of years, number of scenarios) of the total number of climatic refugees
+            (refugees of 2022, due to the sea level rise and to the other climatic events)
+        """
+        years = np.asarray(years)
+
+        # Sea level of each (year, scenario)
+        levels = np.stack([sea_level.sea_levels(years, scenario) for scenario in scenarios], axis=1)
+
+        # Area submerged on each continent between the 2022 level and the level of each (year, scenario)
+        start, stop = self.elevation_index.level_bounds(elevation_2022, levels)
+        area = np.maximum(self.cumulative_area[stop] - self.cumulative_area[start], 0)
+
+        # Refugees on each continent, only for the years in the future
+        future = years > 2022
+        refugees = self.population_densities(years)[:, None, :] * area * future[:, None, None]
+
+        # Add the refugees of 2022 and the refugees due to the other climatic events
+        other = np.array([self.estimate_other_climatic_refugees(int(year)) if year > 2022 else 0 for year in years])
+        total = 32000000 + refugees.sum(axis=2) + other[:, None]
+        return refugees, total
+
     def estimate_other_climatic_refugees(self, year):
         """
         Estimate number of climatic refugees due to the climatic events different from sea level rise.
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class ElevationIndex:
+    def __init__(self, elevations):
+        """
+        Index of the points of the elevation grid sorted by elevation.
+        Instead of a dictionary { elevation → [[lat, lon], ...] }, the points are stored in flat arrays
+        sorted by elevation, so all the points in an interval of elevation are found with two binary searches,
+        and any array defined on the grid (continent, area of the points...) can be read in the same order
+        and summed per level at once (see ElevationData.create_cumulative_area).
+
+        Parameters
+        ----------
+        elevations : numpy array
+            elevation in meters of each point of the grid (flattened, in the order of the grid)
+        """
+        elevations = np.asarray(elevations).ravel()
+
+        # Position of each point in the flattened grid, sorted by elevation
+        # (stable sort keeps the north to south, west to east order for points at the same elevation)
+        self.cells = np.argsort(elevations, kind='stable')
+
+        self.elevations = elevations[self.cells]   # sorted elevations
+        self.levels = np.unique(self.elevations)   # sorted distinct elevations
+
+    def __len__(self):
+        return self.elevations.size
+
+    def bounds(self, low, high):
+        """
+        Find the positions in the sorted arrays of the points with low <= elevation < high.
+
+        Parameters
+        ----------
+        low : float
+            lowest elevation in meters (included)
+        high : float
+            highest elevation in meters (excluded)
+
+        Returns
+        -------
+        start : int
+            position of the first point of the interval
+        stop : int
+            position after the last point of the interval
+        """
+        start = int(np.searchsorted(self.elevations, low, side='left'))
+        stop = int(np.searchsorted(self.elevations, high, side='left'))
+        return start, max(start, stop)
+
+    def query_cells(self, low, high):
+        """
+        Return the positions in the flattened grid of every point with low <= elevation < high,
+        so that any other array defined on the grid can be read for these points.
+
+        Parameters
+        ----------
+        low : float
+            lowest elevation in meters (included)
+        high : float
+            highest elevation in meters (excluded)
+
+        Returns
+        -------
+        cells : numpy array
+            indices of the points in the flattened grid (view, no copy)
+        """
+        start, stop = self.bounds(low, high)
+        return self.cells[start:stop]
+
+    def count(self, low, high):
+        """
+        Count the points with low <= elevation < high.
+
+        Returns
+        -------
+        int
+            number of points in the interval
+        """
+        start, stop = self.bounds(low, high)
+        return stop - start
+
+    def level_bounds(self, low, high):
+        """
+        Find the numbers of the levels (positions in self.levels) of the interval low <= elevation < high,
+        with two binary searches over the distinct elevations. A table with one row per level, cumulated
+        along the levels (see ElevationData.create_cumulative_area), gives the sum over the points of the
+        interval as the difference between its rows stop and start.
+        low and high can also be arrays, to look up many intervals at once.
+
+        Parameters
+        ----------
+        low : float or numpy array
+            lowest elevation in meters (included)
+        high : float or numpy array
+            highest elevation in meters (excluded)
+
+        Returns
+        -------
+        start : int or numpy array
+            number of the first level of the interval
+        stop : int or numpy array
+            number after the last level of the interval
+        """
+        start = np.searchsorted(self.levels, low, side='left')
+        stop = np.searchsorted(self.levels, high, side='left')
+        return start, stop
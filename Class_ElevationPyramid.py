@@ -0,0 +1,180 @@
+import contextlib
+import logging
+import math
+import os
+
+import numpy as np
+
+from Class_ElevationCache import ElevationCache
+
+logger = logging.getLogger(__name__)
+
+
+class ElevationPyramid:
+    def __init__(self, elevation_cache, min_size=256, block_rows=256):
+        """
+        Multi-resolution pyramid of the elevation grid.
+        Level 0 is the full resolution grid of the cache, each next level is 2 times smaller in both directions:
+        a point of level k+1 summarizes a block of 2 x 2 points of level k by its minimum, mean and maximum elevation.
+        The levels are stored as .npy files (int16) in the folder of the cache, so they are built only once
+        and rebuilt with the cache when the .nc file changes.
+
+        Parameters
+        ----------
+        elevation_cache : ElevationCache
+            binary cache of the .nc elevation file
+        min_size : int
+            the last level is the first one with less than min_size points in both directions
+        block_rows : int
+            number of rows of a level computed at once when the pyramid is built
+        """
+        self.elevation_cache = elevation_cache
+        self.min_size = min_size
+        self.block_rows = block_rows
+
+        self.levels = []   # list of {'min': array, 'mean': array, 'max': array}, set by load()
+        self.shape = None  # shape of the full resolution grid
+
+    def level_path(self, level, stat):
+        """
+        Name of the .npy file of a statistic ('min', 'mean' or 'max') of a level of the pyramid.
+
+        Returns
+        -------
+        str
+            path of the file in the folder of the cache
+        """
+        return os.path.join(self.elevation_cache.cache_dir, f"pyramid_{level}_{stat}.npy")
+
+    def load(self):
+        """
+        Map all the levels of the pyramid from the folder of the cache, building the missing ones.
+
+        Returns
+        -------
+        levels : list
+            list of dictionaries {'min': array, 'mean': array, 'max': array}, one per level (memory-mapped, int16)
+        """
+        if self.levels:
+            return self.levels
+
+        _, _, z = self.elevation_cache.load()
+        self.shape = z.shape
+        levels = [{'min': z, 'mean': z, 'max': z}]
+
+        while max(levels[-1]['mean'].shape) >= 2 * self.min_size:
+            level = len(levels)
+            paths = {stat: self.level_path(level, stat) for stat in ('min', 'mean', 'max')}
+            if not all(os.path.exists(path) for path in paths.values()):
+                self.build_level(levels[-1], paths)
+            levels.append({stat: np.load(path, mmap_mode='r') for stat, path in paths.items()})
+
+        self.levels = levels
+        return self.levels
+
+    def build_level(self, previous, paths):
+        """
+        Compute a level of the pyramid from the previous one by blocks of rows, and save it.
+        Each point is the minimum, mean and maximum of a block of 2 x 2 points of the previous level
+        (the last row and column are repeated when the previous level has an odd size).
+
+        Parameters
+        ----------
+        previous : dict
+            {'min': array, 'mean': array, 'max': array} of the previous level
+        paths : dict
+            names of the .npy files of each statistic of the new level
+
+        Returns
+        -------
+        None.
+        """
+        rows, cols = previous['mean'].shape
+        shape = ((rows + 1) // 2, (cols + 1) // 2)
+
+        # The files are renamed together at the end of the block (see ElevationCache.atomic_file)
+        with contextlib.ExitStack() as stack:
+            outputs = {stat: np.lib.format.open_memmap(stack.enter_context(ElevationCache.atomic_file(path)),
+                                                       mode='w+', dtype=np.int16, shape=shape)
+                       for stat, path in paths.items()}
+
+            for start in range(0, shape[0], self.block_rows):
+                stop = min(start + self.block_rows, shape[0])
+                for stat, reduce in (('min', np.min), ('mean', np.mean), ('max', np.max)):
+                    block = self.pairs(previous[stat][2 * start:2 * stop], stop - start, shape[1])
+                    outputs[stat][start:stop] = np.rint(reduce(block, axis=(1, 3)))
+
+            # Close the files before they are renamed
+            for output in outputs.values():
+                output.flush()
+            del outputs
+        logger.info("Level of shape %s built", shape)
+
+    @staticmethod
+    def pairs(block, rows, cols):
+        """
+        Reshape a block of rows of a level into 2 x 2 groups of points, repeating the last row and column
+        if the block is too small.
+
+        Returns
+        -------
+        numpy array
+            array of shape (rows, 2, cols, 2)
+        """
+        block = np.asarray(block)
+        pad_rows = 2 * rows - block.shape[0]
+        pad_cols = 2 * cols - block.shape[1]
+        if pad_rows or pad_cols:
+            block = np.pad(block, ((0, pad_rows), (0, pad_cols)), mode='edge')
+        return block.reshape(rows, 2, cols, 2)
+
+    def level_for(self, rows_span, cols_span, width, height):
+        """
+        Choose the level of the pyramid adapted to the display: the coarsest level which still has
+        at least one point per pixel of the display.
+
+        Parameters
+        ----------
+        rows_span : float
+            number of rows of the full resolution grid visible in the display
+        cols_span : float
+            number of columns of the full resolution grid visible in the display
+        width : int
+            width of the display in pixels
+        height : int
+            height of the display in pixels
+
+        Returns
+        -------
+        int
+            number of the level (0 = full resolution)
+        """
+        points_per_pixel = min(rows_span / max(1, height), cols_span / max(1, width))
+        if points_per_pixel <= 1:
+            return 0
+        return max(0, min(len(self.levels) - 1, int(math.floor(math.log2(points_per_pixel)))))
+
+    def sample(self, level, rows, cols, stat='mean'):
+        """
+        Read the points of a level at the given rows and columns, expressed in indices of the full resolution grid.
+
+        Parameters
+        ----------
+        level : int
+            number of the level
+        rows : numpy array
+            indices of the rows in the full resolution grid
+        cols : numpy array
+            indices of the columns in the full resolution grid
+        stat : str
+            'min', 'mean' or 'max'
+
+        Returns
+        -------
+        numpy array
+            2D array (len(rows) x len(cols)) of elevations in meters
+        """
+        data = self.levels[level][stat]
+        rows = np.minimum(np.asarray(rows, dtype=np.intp) >> level, data.shape[0] - 1)
+        cols = np.minimum(np.asarray(cols, dtype=np.intp) >> level, data.shape[1] - 1)
+        return np.asarray(data[rows[:, None], cols[None, :]])
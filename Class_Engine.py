@@ -0,0 +1,240 @@
+import threading
+
+import numpy as np
+from PIL import Image
+
+from Class_ElevationData import ElevationData
+from Class_LRUCache import LRUCache
+from Class_MapRenderer import MapRenderer
+from Class_SeaLevel import SeaLevel
+from Class_SubmersionYear import SubmersionYear
+
+
+class SimulationEngine:
+    def __init__(self, world_map="ETOPO_2022_v1_60s_N90W180_bed.nc",
+                 country_map="fr_mainland.csv",
+                 contour_map="fr_mainland_contour.csv",
+                 reference_elevation=0.21):
+        """
+        All the computations of the simulation (sea level, maps, climatic refugees, profile of France),
+        without any import of tkinter: it can run on a server or in a batch job without a display.
+        The views of the interface only ask the engine for the results and display them.
+
+        Parameters
+        ----------
+        world_map : str
+            name of the .nc file containing the latitude, longitude and elevation of all points on Earth
+        country_map : str
+            name of the csv file of the elevation points of mainland France
+        contour_map : str
+            name of the csv file of the contour of mainland France
+        reference_elevation : float
+            sea level in 2022, from which the refugees are counted
+        """
+        self.reference_elevation = reference_elevation
+
+        self.sea_level = SeaLevel()
+        self.elevation_data = ElevationData(world_map, country_map, contour_map)
+        self.elevation_cache = self.elevation_data.elevation_cache   # memory-mapped arrays of the .nc file
+        self.map_renderer = MapRenderer(self.elevation_cache, flood_level=self.elevation_data.flood_level)
+        self.submersion_year = SubmersionYear(self.elevation_data.flood_level, self.sea_level)
+
+        self.index_image = None     # PIL "P" image of the elevation indices, recoloured by its palette
+        self.index_key = None       # (width, height, base of the palette) of index_image
+
+        # Recently rendered maps: (sea level, width, height, colour scheme) → image,
+        # the least recently used are removed first when the images exceed 32 MB
+        self.image_cache = LRUCache(32 * 1024 * 1024)
+        self.render_lock = threading.Lock()  # the maps can be rendered in a background thread
+
+        # Years of first submersion sampled for the previews of the slider: (scenario, width, height) → array
+        self.year_previews = {}
+
+    def get_sea_level(self, year: int, scenario: int) -> float:
+        """
+        Sea level in meters of a year for an IPCC scenario (see SeaLevel.retrieve_sea_level).
+        """
+        return self.sea_level.retrieve_sea_level(year, scenario)
+
+    def load_pyramid(self) -> bool:
+        """
+        Load the multi-resolution pyramid used to show the details when zooming in (built only once, which takes
+        a while the first time). Meant to run in its own background task: the maps are rendered without it,
+        and the zoomed views use it once it is ready (see MapRenderer.ready).
+
+        Returns
+        -------
+        bool
+            True once the pyramid is loaded
+        """
+        self.map_renderer.load()
+        return self.map_renderer.ready
+
+    def grid_indices(self, width: int, height: int) -> tuple:
+        """
+        Indices of the latitudes and longitudes of the elevation grid sampled for each pixel of a map
+        of size (width x height) (see MapRenderer.grid_indices).
+
+        Returns
+        -------
+        tuple
+            (lats, lons, lat_indices, lon_indices)
+        """
+        return self.map_renderer.grid_indices(width, height)
+
+    def render_map(self, width: int, height: int, sea_level: float) -> Image.Image:
+        """
+        Render the map of the whole Earth sized (width x height): blue if below sea level, green if above.
+        The inland depressions are only blue when the ocean reaches them (see FloodLevel).
+        Only regenerates if no image is cached for this sea level, size and colour scheme, and then only the palette
+        of the image of elevation indices is rewritten (the elevations are read again only for a new size).
+        Thread-safe: only one map is rendered at a time. The pyramid is not needed here (see load_pyramid).
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of the map for this sea level
+        """
+        # Flood levels of the inland depressions (built only once)
+        self.map_renderer.flood_level.load()
+
+        with self.render_lock:
+            # If an image was already rendered for this sea level, size and colours, no need to render it again
+            # (the recently used images are kept in image_cache, so going back to a year is instant)
+            key = (sea_level, width, height, self.map_renderer.colour_scheme)
+            cached_image = self.image_cache.get(key)
+            if cached_image is not None:
+                return cached_image
+
+            # The image is kept as an image of elevation indices, which only depends on the size and on the window
+            # of elevations of the palette: for a new sea level in the same window, only the palette changes
+            base = self.map_renderer.palette_base(sea_level)
+            if self.index_key != (width, height, base):
+                _, _, lat_indices, lon_indices = self.grid_indices(width, height)
+
+                # Quantise the elevations into an image of indices (built once per size and window)
+                self.index_image = self.map_renderer.map_index_image(lat_indices, lon_indices, base)
+                self.index_key = (width, height, base)
+
+            # define the colour depending on whether above or below water: only the palette is rewritten
+            image = self.index_image.copy()
+            image.putpalette(self.map_renderer.palette(sea_level, base))
+            self.image_cache.put(key, image, LRUCache.image_size(image))
+
+        return image
+
+    def cached_map(self, width: int, height: int, sea_level: float):
+        """
+        Map already rendered for this size, sea level and colour scheme, or None.
+        image_cache has its own lock, so it can be read from the thread of the interface
+        while a map is rendered in the background, without waiting for render_lock.
+        """
+        return self.image_cache.get((sea_level, width, height, self.map_renderer.colour_scheme))
+
+    def render_preview(self, width: int, height: int, sea_level: float, scale: int = 8) -> Image.Image:
+        """
+        Render a low resolution preview of the map in a few milliseconds: the map is rendered scale times smaller
+        from the decimated grid of the flood levels (see MapRenderer.render_preview), then enlarged to
+        (width x height) so that it can be shown instead of the detailed map.
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of size (width x height)
+        """
+        _, _, lat_indices, lon_indices = self.grid_indices(max(1, width // scale), max(1, height // scale))
+        preview = self.map_renderer.render_preview(sea_level, lat_indices, lon_indices)
+        return preview.resize((width, height), Image.NEAREST)
+
+    def render_year_preview(self, width: int, height: int, year: int, scenario: int, scale: int = 4) -> Image.Image:
+        """
+        Render a low resolution map (scale times smaller than width x height) for a year from the years of first
+        submersion (see SubmersionYear). The years are sampled once per size and scenario, then each year only
+        needs one comparison per pixel, so the map can follow the slider of the years while it is dragged.
+        The preview uses the same flood levels and the same sea level of the year as the detailed map (render_map):
+        in the years when the sea level went down below a level reached before, the years of first submersion
+        would also show the points which emerged again, so the flood levels are compared with the sea level of
+        the year instead. Only the resolution differs: the preview is read from the decimated grid, so a few
+        pixels of the coasts can change when the detailed map replaces it.
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of size (width // scale x height // scale)
+        """
+        key = (scenario, max(1, width // scale), max(1, height // scale))
+        sea_level = self.get_sea_level(year, scenario)
+        if np.floor(sea_level) != np.floor(self.submersion_year.level_reached(scenario, year)):
+            _, _, lat_indices, lon_indices = self.grid_indices(key[1], key[2])
+            return self.map_renderer.render_preview(sea_level, lat_indices, lon_indices)
+
+        if key not in self.year_previews:
+            _, _, lat_indices, lon_indices = self.grid_indices(key[1], key[2])
+            self.year_previews[key] = self.map_renderer.sample_years(self.submersion_year.load(scenario),
+                                                                     lat_indices, lon_indices)
+        return self.map_renderer.render_years(self.year_previews[key], year)
+
+    def render_progressive(self, width: int, height: int, sea_level: float):
+        """
+        Render the map in finer and finer versions: a preview at half the resolution from the decimated grid,
+        then the detailed map (see render_map). To be used as a generator, for example in a background task
+        which shows each version as soon as it is ready.
+
+        Yields
+        ------
+        PIL.Image
+            image of the map of size (width x height)
+        """
+        if self.cached_map(width, height, sea_level) is None:
+            yield self.render_preview(width, height, sea_level, scale=2)
+        yield self.render_map(width, height, sea_level)
+
+    def render_viewport(self, sea_level: float, x0: float, y0: float, x1: float, y1: float,
+                        width: int, height: int) -> Image.Image:
+        """
+        Render a part of the map at the resolution of the display (see MapRenderer.render_viewport).
+        The limits are fractions (0 to 1) of the whole map, y from the north.
+        """
+        return self.map_renderer.render_viewport(sea_level, x0, y0, x1, y1, width, height)
+
+    def count_refugees(self, year: int, sea_level: float) -> str:
+        """
+        Number of climatic refugees in a year (see ElevationData.compute_refugees).
+
+        Returns
+        -------
+        str
+            number of refugees in the form 'nb_refugees' millions (or billion)
+        """
+        return self.elevation_data.compute_refugees(year, sea_level, self.reference_elevation)
+
+    def project_refugees(self, years, scenarios: list) -> tuple:
+        """
+        Number of climatic refugees for all the years and scenarios at once (see ElevationData.project_refugees).
+
+        Returns
+        -------
+        refugees : numpy array
+            refugees due to the sea level rise, of shape (years, scenarios, continents)
+        total : numpy array
+            total number of climatic refugees, of shape (years, scenarios)
+        """
+        return self.elevation_data.project_refugees(years, scenarios, self.sea_level, self.reference_elevation)
+
+    def is_in_profile_country(self, lat: float, lon: float) -> bool:
+        """
+        Check if a point is in the country for which a profile view is available (mainland France).
+        """
+        return bool(self.elevation_data.test_if_point_in((lat, lon)))
+
+    def build_profile(self) -> dict:
+        """
+        Average elevation of mainland France for each longitude (see ElevationData.profile_per_long).
+        It does not depend on the sea level, which is drawn over it by the profile view.
+
+        Returns
+        -------
+        dict
+            {longitude rounded to 0.1 degree : average elevation in meters}
+        """
+        return self.elevation_data.profile_per_long()
@@ -0,0 +1,213 @@
+import heapq
+import logging
+import os
+from collections import deque
+
+import numpy as np
+
+from Class_ElevationCache import ElevationCache
+
+try:
+    from skimage.morphology import reconstruction   # optional: much faster computation of the flood levels
+except ImportError:
+    reconstruction = None
+
+logger = logging.getLogger(__name__)
+
+
+class FloodLevel:
+    def __init__(self, elevation_cache, step=5):
+        """
+        Flood level of each point of the elevation grid: the lowest sea level at which the ocean actually
+        reaches the point. A point below sea level is only under water if it is connected to the ocean
+        by points below sea level: inland depressions (Caspian Sea, Dead Sea...) are not flooded until
+        the sea rises above the lowest pass around them, so their flood level is the elevation of this pass.
+        Elsewhere the flood level is the elevation of the point.
+        A point is under water for a sea level if its flood level is <= sea level.
+
+        The flood levels are computed once on the grid keeping one point every step points (the same grid as
+        ElevationData) and stored as a .npy file (int16) in the folder of the cache: with a morphological
+        reconstruction of scikit-image if it is installed, otherwise with a priority-flood in python.
+
+        Parameters
+        ----------
+        elevation_cache : ElevationCache
+            binary cache of the .nc elevation file
+        step : int
+            only one point every step points (in latitude and in longitude) of the .nc file is used
+        """
+        self.elevation_cache = elevation_cache
+        self.step = step
+
+        self.flood = None    # flood level of each point of the decimated grid (memory-mapped, int16), set by load()
+        self.raised = None   # flood level of the points of inland depressions, -32768 elsewhere (int16)
+        self.basins = None   # True for the points of inland depressions below sea level (lake beds, basins)
+
+    def path(self):
+        """
+        Name of the .npy file of the flood levels.
+
+        Returns
+        -------
+        str
+            path of the file in the folder of the cache
+        """
+        return os.path.join(self.elevation_cache.cache_dir, f"flood_level_{self.step}.npy")
+
+    def load(self):
+        """
+        Map the flood levels from the folder of the cache, computing them if they are missing.
+
+        Returns
+        -------
+        flood : numpy array
+            2D array (int16) of the flood level in meters of each point of the decimated grid
+        """
+        if self.flood is not None:
+            return self.flood
+
+        _, _, z = self.elevation_cache.load()
+        elev = np.asarray(z[::self.step, ::self.step])
+
+        path = self.path()
+        if not os.path.exists(path):
+            flood = self.compute(elev)
+            ElevationCache.save_atomic(path, flood)
+            logger.info("Flood levels of shape %s built", flood.shape)
+
+        self.flood = np.load(path, mmap_mode='r')
+        self.raised = np.where(self.flood > elev, self.flood, -32768).astype(np.int16)
+        self.basins = (self.flood > elev) & (elev < 0)
+        return self.flood
+
+    @staticmethod
+    def compute(elev):
+        """
+        Flood levels of a grid of elevations from its lowest point (in the deepest ocean trench): the flood level
+        of a point is the lowest value, over all the paths from the lowest point, of the highest elevation
+        along the path (and at least the elevation of the point).
+        This is a morphological reconstruction by erosion of the grid from the lowest point, done in C by
+        scikit-image. It does not wrap around in longitude, so the first and last columns are compared after
+        each reconstruction and it is done again from the lower levels found across the border, until nothing
+        changes (usually once or twice). Without scikit-image, see priority_flood (same result, slower).
+
+        Parameters
+        ----------
+        elev : numpy array
+            2D array (rows = latitudes, columns = longitudes) of elevations in meters (int)
+
+        Returns
+        -------
+        flood : numpy array
+            2D array (int16) of the flood levels in meters
+        """
+        if reconstruction is None:
+            return FloodLevel.priority_flood(elev)
+
+        elev = np.asarray(elev, dtype=np.int32)
+        cross = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]], dtype=bool)   # 4 neighbours, as in priority_flood
+
+        # Start from the highest elevation everywhere except at the lowest point
+        seed = np.full(elev.shape, elev.max(), dtype=np.int32)
+        start = np.unravel_index(np.argmin(elev), elev.shape)
+        seed[start] = elev[start]
+
+        while True:
+            flood = reconstruction(seed, elev, method='erosion', footprint=cross).astype(np.int32)
+
+            # The first and last columns are neighbours: a point of one of them can be reached through the other
+            west = np.maximum(elev[:, 0], np.minimum(flood[:, 0], flood[:, -1]))
+            east = np.maximum(elev[:, -1], np.minimum(flood[:, -1], flood[:, 0]))
+            if np.array_equal(west, flood[:, 0]) and np.array_equal(east, flood[:, -1]):
+                return flood.astype(np.int16)
+            seed = flood
+            seed[:, 0] = west
+            seed[:, -1] = east
+
+    @staticmethod
+    def priority_flood(elev):
+        """
+        Priority-flood of a grid of elevations from its lowest point (in the deepest ocean trench).
+        The points are visited from the lowest flood level to the highest: each neighbour of a visited point gets
+        the flood level max(its elevation, flood level of the point). A neighbour lower than the current level
+        is in a depression and is filled at this level, without going through the priority queue.
+        The grid wraps around in longitude (the first and last columns are neighbours).
+
+        Parameters
+        ----------
+        elev : numpy array
+            2D array (rows = latitudes, columns = longitudes) of elevations in meters (int)
+
+        Returns
+        -------
+        flood : numpy array
+            2D array (int16) of the flood levels in meters
+        """
+        nb_rows, nb_cols = elev.shape
+        size = nb_rows * nb_cols
+
+        # Python lists are much faster than numpy arrays to read and write one value at a time
+        heights = np.asarray(elev, dtype=np.int64).ravel().tolist()
+        flood = heights[:]
+        visited = bytearray(size)
+
+        # Each point of the priority queue is one integer: (flood level + offset) * 2**32 + index of the point,
+        # so that the points are sorted by flood level without creating tuples
+        offset = 1 << 16
+        mask = (1 << 32) - 1
+
+        start = int(np.argmin(elev))
+        visited[start] = 1
+        queue = [(heights[start] + offset) << 32 | start]
+        pit = deque()   # points filled at the current level
+
+        while queue or pit:
+            if pit:
+                cell = pit.popleft()
+            else:
+                cell = heapq.heappop(queue) & mask
+            level = flood[cell]
+
+            row, col = divmod(cell, nb_cols)
+            west = cell - 1 if col > 0 else cell + nb_cols - 1
+            east = cell + 1 if col < nb_cols - 1 else cell - nb_cols + 1
+            neighbours = [west, east]
+            if row > 0:
+                neighbours.append(cell - nb_cols)
+            if row < nb_rows - 1:
+                neighbours.append(cell + nb_cols)
+
+            for neighbour in neighbours:
+                if visited[neighbour]:
+                    continue
+                visited[neighbour] = 1
+                if heights[neighbour] <= level:
+                    flood[neighbour] = level
+                    pit.append(neighbour)
+                else:
+                    heapq.heappush(queue, (heights[neighbour] + offset) << 32 | neighbour)
+
+        return np.array(flood, dtype=np.int16).reshape(nb_rows, nb_cols)
+
+    def effective(self, elev, rows, cols):
+        """
+        Raise the elevations of the points of inland depressions to their flood level, so that they are
+        coloured as sea only when the ocean reaches them (the other points keep their elevation).
+
+        Parameters
+        ----------
+        elev : numpy array
+            2D array (len(rows) x len(cols)) of elevations in meters
+        rows : numpy array
+            indices of the rows of elev in the full resolution grid
+        cols : numpy array
+            indices of the columns of elev in the full resolution grid
+
+        Returns
+        -------
+        numpy array
+            2D array of the elevations in meters, at least the flood level in the depressions
+        """
+        rows = np.minimum(np.asarray(rows, dtype=np.intp) // self.step, self.raised.shape[0] - 1)
+        cols = np.minimum(np.asarray(cols, dtype=np.intp) // self.step, self.raised.shape[1] - 1)
+        return np.maximum(elev, self.raised[rows[:, None], cols[None, :]])
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_bytes):
+        """
+        Cache of objects bounded in memory: when the total size of the stored objects exceeds max_bytes,
+        the least recently used objects are removed first.
+        The cache can be used from several threads at once (for example the thread of the interface and the
+        threads rendering the maps in the background): each operation holds a lock.
+
+        Parameters
+        ----------
+        max_bytes : int
+            maximum total size in bytes of the stored objects
+        """
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()   # key → (value, size in bytes), from the least to the most recently used
+        self.nb_bytes = 0            # total size of the stored objects
+        self.lock = threading.Lock()  # held while the objects are read, moved or removed
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def get(self, key, default=None):
+        """
+        Return the object stored for a key and mark it as the most recently used.
+
+        Parameters
+        ----------
+        key : hashable
+            key of the object
+        default : any
+            returned if the key is not in the cache
+
+        Returns
+        -------
+        the stored object, or default
+        """
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key][0]
+
+    def put(self, key, value, size):
+        """
+        Store an object, then remove the least recently used objects until the cache fits in max_bytes.
+        An object larger than max_bytes is not stored.
+
+        Parameters
+        ----------
+        key : hashable
+            key of the object
+        value : any
+            object to store
+        size : int
+            size of the object in bytes
+
+        Returns
+        -------
+        None.
+        """
+        with self.lock:
+            if key in self.items:
+                self.nb_bytes -= self.items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self.items[key] = (value, size)
+            self.nb_bytes += size
+
+            while self.nb_bytes > self.max_bytes:
+                _, (_, old_size) = self.items.popitem(last=False)
+                self.nb_bytes -= old_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all the stored objects.
+
+        Returns
+        -------
+        None.
+        """
+        with self.lock:
+            self.items.clear()
+            self.nb_bytes = 0
+
+    @staticmethod
+    def image_size(image):
+        """
+        Size in bytes of the pixels of a PIL image.
+
+        Returns
+        -------
+        int
+            width x height x number of bytes per pixel
+        """
+        return image.width * image.height * len(image.getbands())
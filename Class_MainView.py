@@ -1,5 +1,6 @@
 import datetime
 import customtkinter as ctk
+from tkinter import filedialog
 
 from Class_SecondaryView import SecondaryView
 
@@ -26,11 +27,19 @@ class MainView(ctk.CTk):
         self.font = "times"
         self.police = 12
 
+        # live preview of the map while the slider of the years is dragged
+        self.preview_year = None   # latest year of the slider to preview
+        self.preview_job = None    # pending preview (after)
+        self.settle_job = None     # pending full quality map (after)
+        self.settle_delay = 300    # time in milliseconds without movement of the slider before the full quality map
+        self.playback_job = None   # pending frame of the animation (after)
+
         # methods
         self.controller = controller
         self.secondary_view = SecondaryView(self.controller)
 
         self.create_widget()
+        self.poll_tasks()
         #self.controller.set_views(self, self.secondary_view)
 
 
@@ -129,6 +138,32 @@ class MainView(ctk.CTk):
                                              )
         self.increase_button.grid(row=3, column=1, pady=5)
 
+        # Play/export the animation through the years (button)
+        self.play_button = ctk.CTkButton(self.frame_bottom_left,
+                                         text="Play",
+                                         font=ctk.CTkFont(family=self.font,
+                                                          size=self.police,
+                                                          ),
+                                         fg_color=self.bc,
+                                         hover_color=self.hbc,
+                                         width=50,
+                                         command=self.toggle_playback
+                                         )
+        self.play_button.grid(row=4, column=0, pady=5)
+
+        self.export_button = ctk.CTkButton(self.frame_bottom_left,
+                                           text="Export",
+                                           font=ctk.CTkFont(family=self.font,
+                                                            size=self.police,
+                                                            ),
+                                           fg_color=self.bc,
+                                           hover_color=self.hbc,
+                                           width=50,
+                                           command=self.export_animation
+                                           )
+        self.export_button.grid(row=4, column=1, pady=5)
+        self.frame_interval = 125   # time in milliseconds between two frames of the animation (8 frames per second)
+
     # Sea level
         self.sea_level_title = ctk.CTkLabel(self.frame_bottom_left,
                                             text="Sea level:",
@@ -312,6 +347,41 @@ class MainView(ctk.CTk):
         sea_level = round(self.controller.get_sea_level(self.get_user_year(), int(self.get_ipcc_value())), 3)
         self.sea_level_label.configure(text=f"{sea_level} m")
 
+        # Live preview of the map (or of the profile view): at most one preview per frame of the display (16 ms)
+        # with the latest year, then the map in full quality when the slider has not moved for settle_delay ms
+        if self.controller.playback is not None:
+            return
+        self.preview_year = year
+        if self.preview_job is None:
+            self.preview_job = self.after(16, self.show_year_preview)
+        if self.settle_job is not None:
+            self.after_cancel(self.settle_job)
+        self.settle_job = self.after(self.settle_delay, self.on_scale_settled)
+
+    def show_year_preview(self):
+        """
+        Show the preview of the latest year of the slider on the map.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.preview_job = None
+        self.controller.preview_year(self.preview_year)
+
+    def on_scale_settled(self):
+        """
+        Render the map in full quality once the slider has stopped moving.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.settle_job = None
+        self.controller.settle_year()
+
     def increase_scale(self):
         """
         Increases the year on the scale by 5.
@@ -340,6 +410,86 @@ class MainView(ctk.CTk):
         self.year_scale.set(new_val)
         self.on_scale_change(new_val)
 
+    def toggle_playback(self):
+        """
+        Start the animation of the map through the years for the chosen scenario, from the year of the scale,
+        or stop it if it is running.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.controller.playback is not None:
+            # The pending frame must not be shown, or continue the next animation if Play is pressed again at once
+            if self.playback_job is not None:
+                self.after_cancel(self.playback_job)
+                self.playback_job = None
+            self.controller.stop_playback()
+            self.play_button.configure(text="Play")
+            return
+
+        # Remove placeholder if it exists
+        if self.placeholder_label.winfo_exists():
+            self.placeholder_label.destroy()
+
+        self.controller.play()
+        self.play_button.configure(text="Stop")
+        self.playback_job = self.after(self.frame_interval, self.play_step, self.controller.playback)
+
+    def play_step(self, playback):
+        """
+        Display the next frame of the animation if it is ready, then wait for the next one.
+        The frames are rendered in advance in the background, so there is usually one ready at each step.
+
+        Parameters
+        ----------
+        playback : Playback
+            animation of this step: nothing is done if it was stopped or replaced by another one
+
+        Returns
+        -------
+        None.
+
+        """
+        self.playback_job = None
+        if playback is not self.controller.playback:
+            return
+
+        frame = playback.next_frame()
+        if frame is not None:
+            year, sea_level, image = frame
+            self.year_scale.set(year)
+            self.on_scale_change(year)
+            self.controller.show_frame(sea_level, image)
+
+        if playback.finished:
+            if playback.error is not None:
+                print("[MAINVIEW] The animation stopped, a frame could not be rendered:", playback.error)
+            self.controller.stop_playback()
+            self.play_button.configure(text="Play")
+        else:
+            self.playback_job = self.after(self.frame_interval, self.play_step, playback)
+
+    def export_animation(self):
+        """
+        Ask for the name of the file and save the animation of the chosen scenario from 1950 to 2445
+        in the background: an animated GIF, or PNG files in a folder if the name does not end with .gif.
+
+        Returns
+        -------
+        None.
+
+        """
+        path = filedialog.asksaveasfilename(defaultextension=".gif",
+                                            filetypes=[("Animated GIF", "*.gif"), ("Folder of PNG files", "*")])
+        if not path:
+            return
+        self.export_button.configure(text="Saving...")
+        self.controller.export_animation(path,
+                                         lambda nb_frames: self.export_button.configure(text="Export"),
+                                         on_error=lambda error: self.export_button.configure(text="Export"))
+
     def get_ipcc_value(self):
         """
         Store the user's choice of scenario.
@@ -389,6 +539,7 @@ class MainView(ctk.CTk):
     def generate_map_canvas(self):
         """
         Create the map of the Earth from the top or side view depending on the user's choice of display.
+        The loading label stays until the map is ready (see map_ready).
 
         Returns
         -------
@@ -398,25 +549,68 @@ class MainView(ctk.CTk):
 
         self.controller.top_or_side()
 
+    def map_ready(self):
+        """
+        Remove the loading label once the map is displayed.
+
+        Returns
+        -------
+        None.
+
+        """
         self.loading_label.place_forget()
 
+    def poll_tasks(self):
+        """
+        Display the results of the computations finished in the background (map, refugees),
+        then check again in 20 ms.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.controller.task_runner.poll()
+        self.after(20, self.poll_tasks)
+
     def count_refugees(self):
         """
-        Retrieve the number of climatic refugees computed in the controller and display an adapted message
-        in the text zone dedicated on the interface n clicking on the button generate_refugees.
+        Ask the controller for the number of climatic refugees, computed in the background,
+        on clicking on the button generate_refugees. The message is displayed by show_refugees_amount.
+
+        Returns
+        -------
+        None.
+
+        """
+        year = self.year_scale.get()
+        self.controller.count_refugees(lambda amount: self.show_refugees_amount(year, amount),
+                                       on_error=lambda error: self.show_refugees.configure(
+                                           text="The number of climatic refugees could not be computed."))
+
+    def show_refugees_amount(self, year, amount):
+        """
+        Display an adapted message with the number of climatic refugees
+        in the text zone dedicated on the interface.
+
+        Parameters
+        ----------
+        year : float
+            year of the scale when the number of refugees was requested
+        amount : string
+            number of climatic refugees computed in the controller
 
         Returns
         -------
         None.
 
         """
-        amount = self.controller.count_refugees()
-        if 2021 < self.year_scale.get() < 2025:
-            self.show_refugees.configure(text=f"In {int(self.year_scale.get())}, there were {amount} climatic refugees.")
-        elif self.year_scale.get() == 2025:
-            self.show_refugees.configure(text=f"In {int(self.year_scale.get())}, there are {amount} climatic refugees.")
-        elif 2025 < self.year_scale.get() < 2523:
-            self.show_refugees.configure(text=f"In {int(self.year_scale.get())}, there will be {amount} climatic refugees.")
+        if 2021 < year < 2025:
+            self.show_refugees.configure(text=f"In {int(year)}, there were {amount} climatic refugees.")
+        elif year == 2025:
+            self.show_refugees.configure(text=f"In {int(year)}, there are {amount} climatic refugees.")
+        elif 2025 < year < 2523:
+            self.show_refugees.configure(text=f"In {int(year)}, there will be {amount} climatic refugees.")
         else:
             self.show_refugees.configure(text="We cannot tell how many climatic refugees there are.\n Please select a year between 2022 and 2525.")
 
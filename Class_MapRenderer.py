@@ -0,0 +1,386 @@
+import numpy as np
+from PIL import Image
+
+from Class_ElevationPyramid import ElevationPyramid
+from Class_FloodLevel import FloodLevel
+from Class_LRUCache import LRUCache
+
+
+class MapRenderer:
+    def __init__(self, elevation_cache, tile_size=256, tile_cache_bytes=64 * 1024 * 1024, flood_level=None):
+        """
+        Render images of the map of the Earth (land in green, sea in blue) from the elevation data,
+        without any dependency on the interface (no tkinter), so that it can also be used outside of the window.
+
+        Parameters
+        ----------
+        elevation_cache : ElevationCache
+            binary cache of the .nc elevation file
+        tile_size : int
+            width and height of a tile in points of a level of the pyramid
+        tile_cache_bytes : int
+            maximum memory in bytes used by the cache of tiles
+        flood_level : FloodLevel
+            flood levels of the elevation grid (created from elevation_cache if None)
+        """
+        self.elevation_cache = elevation_cache
+        self.pyramid = ElevationPyramid(elevation_cache)
+        # the inland depressions are only sea when the ocean reaches them
+        self.flood_level = flood_level if flood_level is not None else FloodLevel(elevation_cache)
+        self.tile_size = tile_size
+
+        # Index images of the tiles: (level, tile x, tile y, base of the palette) → image,
+        # the least recently used are removed first
+        self.tile_cache = LRUCache(tile_cache_bytes)
+
+        # define the colour depending on whether above or below water: name of the scheme → (water, land)
+        self.colour_schemes = {"default": ((25, 25, 112), (94, 200, 80))} #very dark  (31, 120, 50), kinda blue (80, 200, 120)
+        self.colour_scheme = "default"
+
+    def load(self):
+        """
+        Load the pyramid of the elevation grid and the flood levels (built once and stored with the cache).
+
+        Returns
+        -------
+        None.
+        """
+        self.pyramid.load()
+        self.flood_level.load()
+
+    @property
+    def ready(self):
+        return bool(self.pyramid.levels)
+
+    @property
+    def water_rgb(self):
+        return self.colour_schemes[self.colour_scheme][0]
+
+    @property
+    def land_rgb(self):
+        return self.colour_schemes[self.colour_scheme][1]
+
+    @staticmethod
+    def palette_base(sea_level):
+        """
+        Choose the window of elevations of the index images adapted to a sea level.
+        An index image stores 256 values: index 0 for the elevations below base, indices 1 to 254 for each meter
+        from base to base + 253 and index 255 for the elevations above. The elevations are whole meters,
+        so a point is below sea level if its elevation is <= floor(sea_level): the colours are exact as long as
+        base - 1 <= floor(sea_level) <= base + 253. The windows start every 128 meters from -1 m, so the index
+        images are only rebuilt when the sea level leaves the window (above 252 m for the first one).
+
+        Parameters
+        ----------
+        sea_level : float
+            sea level in meters
+
+        Returns
+        -------
+        int
+            lowest elevation in meters with its own index
+        """
+        threshold = int(np.floor(sea_level))
+        if threshold > 252:
+            window = -((252 - threshold) // 128)   # first window reaching the sea level
+        elif threshold < -2:
+            window = (threshold + 1) // 128         # below the first window (never the case for a real sea level)
+        else:
+            window = 0
+        return -1 + 128 * window
+
+    @staticmethod
+    def index_image(elev, base):
+        """
+        Quantise a grid of elevations into an image of indices (PIL "P" mode) for the window starting at base.
+
+        Parameters
+        ----------
+        elev : numpy array
+            2D array of elevations in meters (one per pixel)
+        base : int
+            lowest elevation with its own index (see palette_base)
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of the same size as elev (without palette)
+        """
+        indices = (np.clip(np.asarray(elev, dtype=np.int32) - base, -1, 254) + 1).astype(np.uint8)
+        return Image.fromarray(indices, mode='L').convert('P')
+
+    def grid_indices(self, width, height):
+        """
+        Compute the indices of the latitudes and longitudes of the elevation grid sampled for each pixel
+        of a map of the whole Earth of size (width x height).
+
+        Returns
+        -------
+        lats : numpy array
+            latitudes of the elevation grid
+        lons : numpy array
+            longitudes of the elevation grid
+        lat_indices : numpy array
+            index of the latitude of each row of the image (from north to south)
+        lon_indices : numpy array
+            index of the longitude of each column of the image
+        """
+        # Read the latitude and longitude arrays (from the binary cache of the netCDF dataset if it is available)
+        lats, lons = self.elevation_cache.read_axes()
+
+        # reverse the lattitude (north to south) to match image coordinates and space evenly coordinates
+        lat_indices = np.linspace(len(lats)-1, 0, height).round().astype(int)
+        lon_indices = np.linspace(0, len(lons)-1, width).round().astype(int)
+        return lats, lons, lat_indices, lon_indices
+
+    def map_index_image(self, lat_indices, lon_indices, base):
+        """
+        Create the index image of the map sampled at the given rows and columns of the elevation grid:
+        only these points are read from the cache, and the points of the inland depressions get their
+        flood level (see FloodLevel). The image is coloured for a sea level by its palette.
+
+        Parameters
+        ----------
+        lat_indices : numpy array
+            index of the latitude of each row of the image (from north to south)
+        lon_indices : numpy array
+            index of the longitude of each column of the image
+        base : int
+            lowest elevation with its own index (see palette_base)
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of size (len(lon_indices) x len(lat_indices)) (without palette)
+        """
+        # Read only the sampled rows and columns instead of the whole elevation grid
+        elev = self.elevation_cache.read_subset(lat_indices, lon_indices)
+
+        # The points of the inland depressions get their flood level, the lowest sea level reaching them
+        elev = self.flood_level.effective(elev, lat_indices, lon_indices)
+        return self.index_image(elev, base)
+
+    def render_preview(self, sea_level, lat_indices, lon_indices):
+        """
+        Render a map quickly from the flood levels of the decimated grid (see FloodLevel), which are already
+        in memory: it is less detailed than the map read from the full resolution grid, but it takes a few
+        milliseconds, so it can be shown while the detailed map is rendered.
+
+        Parameters
+        ----------
+        sea_level : float
+            sea level in meters
+        lat_indices : numpy array
+            index of the latitude of each row of the image in the full resolution grid (from north to south)
+        lon_indices : numpy array
+            index of the longitude of each column of the image in the full resolution grid
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of size (len(lon_indices) x len(lat_indices))
+        """
+        flood = self.flood_level.load()
+        step = self.flood_level.step
+        rows = np.minimum(np.asarray(lat_indices, dtype=np.intp) // step, flood.shape[0] - 1)
+        cols = np.minimum(np.asarray(lon_indices, dtype=np.intp) // step, flood.shape[1] - 1)
+        return self.colour(flood[rows[:, None], cols[None, :]], sea_level)
+
+    def palette(self, sea_level, base):
+        """
+        Create the palette of the index images for a sea level: the indices of the elevations below or at
+        sea level are blue, the others green. Changing the sea level only changes the palette.
+
+        Parameters
+        ----------
+        sea_level : float
+            sea level in meters
+        base : int
+            lowest elevation with its own index (see palette_base)
+
+        Returns
+        -------
+        list
+            768 values (red, green, blue for each of the 256 indices)
+        """
+        # Last index below or at sea level (index 0 = elevations below base)
+        last_water = min(255, max(-1, int(np.floor(sea_level)) - base + 1))
+        return list(self.water_rgb) * (last_water + 1) + list(self.land_rgb) * (255 - last_water)
+
+    def colour(self, elev, sea_level):
+        """
+        Create the image of a grid of elevations: blue if below or at sea level, green if above.
+
+        Parameters
+        ----------
+        elev : numpy array
+            2D array of elevations in meters (one per pixel)
+        sea_level : float
+            sea level in meters
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of the same size as elev
+        """
+        base = self.palette_base(sea_level)
+        image = self.index_image(elev, base)
+        image.putpalette(self.palette(sea_level, base))
+        return image
+
+    def sample_years(self, first_year, rows, cols):
+        """
+        Read a raster of the years of first submersion (see SubmersionYear) at the points of an image.
+
+        Parameters
+        ----------
+        first_year : numpy array
+            2D array (uint16) of the first year under water of each point of the decimated grid
+        rows : numpy array
+            indices of the rows of the image in the full resolution grid
+        cols : numpy array
+            indices of the columns of the image in the full resolution grid
+
+        Returns
+        -------
+        numpy array
+            2D array (len(rows) x len(cols)) of the first year under water of each pixel
+        """
+        step = self.flood_level.step
+        rows = np.minimum(np.asarray(rows, dtype=np.intp) // step, first_year.shape[0] - 1)
+        cols = np.minimum(np.asarray(cols, dtype=np.intp) // step, first_year.shape[1] - 1)
+        return np.asarray(first_year[rows[:, None], cols[None, :]])
+
+    def render_years(self, first_year, year):
+        """
+        Create the image of the map for a year from the years of first submersion of its pixels (see sample_years):
+        blue if the point is under water in this year, green otherwise. There is only one comparison per pixel,
+        so it is cheap enough to follow the slider of the years.
+
+        Parameters
+        ----------
+        first_year : numpy array
+            2D array (uint16) of the first year under water of each pixel
+        year : int
+            year chosen by the user
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of the same size as first_year
+        """
+        # Index 0 for the points under water, 1 for the others
+        land = (first_year > year).astype(np.uint8)
+        image = Image.fromarray(land, mode='L').convert('P')
+        image.putpalette(list(self.water_rgb) + list(self.land_rgb))
+        return image
+
+    def render_tile(self, level, tile_x, tile_y, base):
+        """
+        Render a tile of the map: a square of tile_size x tile_size points of a level of the pyramid
+        (smaller on the east and south borders). The tiles are numbered from the north-west corner of the map.
+        The tile is an index image: it does not depend on the sea level, only on the window of elevations.
+
+        Parameters
+        ----------
+        level : int
+            number of the level of the pyramid
+        tile_x : int
+            column of the tile (0 = west)
+        tile_y : int
+            row of the tile (0 = north)
+        base : int
+            lowest elevation with its own index (see palette_base)
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of the tile
+        """
+        data = self.pyramid.levels[level]['mean']
+        nb_rows, nb_cols = data.shape
+
+        # Rows of the tile in the level (the rows of the grid go from south to north, the image from north to south)
+        top = nb_rows - tile_y * self.tile_size
+        bottom = max(0, top - self.tile_size)
+        left = tile_x * self.tile_size
+        right = min(nb_cols, left + self.tile_size)
+
+        elev = np.asarray(data[bottom:top, left:right])[::-1]
+
+        # Raise the inland depressions to their flood level (indices of the rows and columns in the full resolution grid)
+        rows = np.arange(top - 1, bottom - 1, -1) << level
+        cols = np.arange(left, right) << level
+        elev = self.flood_level.effective(elev, rows, cols)
+        return self.index_image(elev, base)
+
+    def get_tile(self, level, tile_x, tile_y, base):
+        """
+        Return a tile from the cache of tiles, rendering it only if it is not in the cache.
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of the tile
+        """
+        key = (level, tile_x, tile_y, base)
+        tile = self.tile_cache.get(key)
+        if tile is None:
+            tile = self.render_tile(level, tile_x, tile_y, base)
+            self.tile_cache.put(key, tile, LRUCache.image_size(tile))
+        return tile
+
+    def render_viewport(self, sea_level, x0, y0, x1, y1, width, height):
+        """
+        Render the visible part of the map at the resolution of the display.
+        The level of the pyramid is chosen so that there is about one point of elevation per pixel:
+        when zoomed in, finer levels are used and the details of the full resolution grid appear,
+        instead of enlarging the pixels of a small image.
+        Only the tiles of this level which intersect the visible part are assembled (and rendered if they
+        are not in the cache of tiles), so the time to render does not depend on the zoom.
+
+        Parameters
+        ----------
+        sea_level : float
+            sea level in meters
+        x0, x1 : float
+            left and right limits of the visible part, in fraction (0 to 1) of the width of the whole map
+        y0, y1 : float
+            top and bottom limits of the visible part, in fraction (0 to 1) of the height of the whole map (0 = north)
+        width : int
+            width of the visible part in pixels
+        height : int
+            height of the visible part in pixels
+
+        Returns
+        -------
+        PIL.Image
+            "P" image of size (width x height)
+        """
+        nb_rows, nb_cols = self.pyramid.shape
+        level = self.pyramid.level_for((y1 - y0) * nb_rows, (x1 - x0) * nb_cols, width, height)
+        level_rows, level_cols = self.pyramid.levels[level]['mean'].shape
+
+        # Visible part in points of the level
+        left, right = x0 * level_cols, x1 * level_cols
+        top, bottom = y0 * level_rows, y1 * level_rows
+
+        # Tiles intersecting the visible part
+        first_x = max(0, int(left // self.tile_size))
+        last_x = min((level_cols - 1) // self.tile_size, int(np.ceil(right / self.tile_size)) - 1)
+        first_y = max(0, int(top // self.tile_size))
+        last_y = min((level_rows - 1) // self.tile_size, int(np.ceil(bottom / self.tile_size)) - 1)
+
+        # Assemble the tiles in one index image, then colour it for the sea level with its palette
+        base = self.palette_base(sea_level)
+        mosaic = Image.new("P", ((last_x - first_x + 1) * self.tile_size, (last_y - first_y + 1) * self.tile_size))
+        for tile_y in range(first_y, last_y + 1):
+            for tile_x in range(first_x, last_x + 1):
+                tile = self.get_tile(level, tile_x, tile_y, base)
+                mosaic.paste(tile, ((tile_x - first_x) * self.tile_size, (tile_y - first_y) * self.tile_size))
+        mosaic.putpalette(self.palette(sea_level, base))
+
+        # Crop the visible part and scale it to the display
+        box = (left - first_x * self.tile_size, top - first_y * self.tile_size,
+               right - first_x * self.tile_size, bottom - first_y * self.tile_size)
+        return mosaic.resize((width, height), Image.NEAREST, box=box)
@@ -0,0 +1,167 @@
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Playback:
+    def __init__(self, engine, width, height, scenario, years, buffer_size=8):
+        """
+        Animation of the map through the years for a scenario.
+        The frames are rendered ahead of time by a background thread (the producer) and stored in a bounded
+        queue (ring buffer): the producer waits when the buffer is full, and the animation only takes the next
+        frame from the buffer, so it keeps a steady frame rate while the next frames are rendered.
+        The same frames can be saved as an animated GIF or as a sequence of PNG files (see export).
+
+        Parameters
+        ----------
+        engine : SimulationEngine
+            renders the maps (no tkinter)
+        width, height : int
+            size of the maps in pixels
+        scenario : int
+            IPCC scenario of the animation
+        years : list
+            years of the animation, in order
+        buffer_size : int
+            maximum number of frames rendered in advance
+        """
+        self.engine = engine
+        self.width = width
+        self.height = height
+        self.scenario = scenario
+        self.years = list(years)
+
+        self.frames = queue.Queue(maxsize=buffer_size)   # (year, sea level, image), None after the last frame
+        self.stop_event = threading.Event()
+        self.producer = None
+        self.finished = False   # True once the last frame was taken from the buffer
+        self.error = None       # exception raised while rendering the frames, if any
+
+    def start(self):
+        """
+        Start rendering the frames in the background.
+
+        Returns
+        -------
+        None.
+        """
+        self.producer = threading.Thread(target=self.produce, daemon=True)
+        self.producer.start()
+
+    def produce(self):
+        """
+        Render the frames of all the years one after the other and put them in the buffer
+        (run by the producer thread), then put None to mark the end.
+        If a frame cannot be rendered, the error is kept in self.error and the end is marked anyway,
+        so that the animation or the export does not wait forever.
+
+        Returns
+        -------
+        None.
+        """
+        try:
+            for year in self.years:
+                sea_level = self.engine.get_sea_level(year, self.scenario)
+                image = self.engine.render_map(self.width, self.height, sea_level)
+                if not self.put((year, sea_level, image)):
+                    return
+        except Exception as error:
+            self.error = error
+        self.put(None)
+
+    def put(self, frame):
+        """
+        Put a frame in the buffer, waiting while it is full, unless the animation is stopped.
+
+        Returns
+        -------
+        bool
+            False if the animation was stopped
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.frames.put(frame, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def next_frame(self):
+        """
+        Take the next frame from the buffer without waiting (to be called from the thread of the interface).
+
+        Returns
+        -------
+        tuple
+            (year, sea level, image), or None if the next frame is not ready yet or the animation is finished
+        """
+        if self.finished:
+            return None
+        try:
+            frame = self.frames.get_nowait()
+        except queue.Empty:
+            return None
+        if frame is None:
+            self.finished = True
+        return frame
+
+    def stop(self):
+        """
+        Stop the producer thread.
+
+        Returns
+        -------
+        None.
+        """
+        self.stop_event.set()
+
+    def export(self, path, duration=125):
+        """
+        Render all the frames with the same producer and save them: as an animated GIF if the path ends
+        with .gif, otherwise as PNG files (one per year) in the folder path, which can then be assembled into
+        a video (for example with ffmpeg).
+
+        Parameters
+        ----------
+        path : str
+            name of the .gif file or of the folder of the PNG files
+        duration : int
+            time in milliseconds during which each frame of the GIF is shown
+
+        Returns
+        -------
+        int
+            number of frames saved
+
+        Raises
+        ------
+        Exception
+            the error raised while rendering the frames, if any (nothing is saved then)
+        """
+        self.start()
+        images = []
+        nb_frames = 0
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            year, _, image = frame
+            nb_frames += 1
+            if path.lower().endswith(".gif"):
+                images.append(image)
+            else:
+                os.makedirs(path, exist_ok=True)
+                image.save(os.path.join(path, f"map_scenario{self.scenario}_{year}.png"))
+
+        if self.error is not None:
+            raise self.error
+
+        if images:
+            images[0].save(path, save_all=True, append_images=images[1:], duration=duration, loop=0)
+        logger.info("%s frames saved in %s", nb_frames, path)
+        return nb_frames
@@ -1,6 +1,8 @@
 import customtkinter as ctk
 from PIL import Image, ImageTk, ImageDraw, ImageFont
 
+from Class_RedrawScheduler import RedrawScheduler
+
 
 class ProfileView():
     def __init__(self):
@@ -15,6 +17,7 @@ class ProfileView():
         
         super().__init__()
 
+        self.canvas = None
         self.image = None
         self.photo = None
         self.dico_per_long = {}
@@ -23,11 +26,15 @@ class ProfileView():
         self.axis_font = ImageFont.truetype("arial.ttf", size=18)
 
         self.sky_image = None  # Background image
+        self.redraw_scheduler = None  # Coalesces the redraws when the window is resized, set by draw_profile()
+        self.layers = {}          # Cached layers of the drawing: name → (inputs, image), see layer()
+        self.profile_version = 0  # Incremented when the profile changes, to rebuild the terrain layer
 
 
     def draw_profile(self, frame, width, height, dico_per_long, sea_level):
         """
         Create the profile view of a country in the main window of the interface.
+        The canvas is created the first time only: it is packed again in the frame afterwards.
         The sea is placed at the bottom in blue, 
         Height of the canva = sea height + maximum elevation average +1,   
         Width of the canva = nb longitudes + 2
@@ -43,7 +50,8 @@ class ProfileView():
         height : int
             Height of the profile view
         dico_per_long : dict
-            Dictionary containing the longitudes and their associated elevation
+            Dictionary containing the longitudes and their associated average elevation
+            (the sea level is not subtracted: the sea is drawn over the terrain)
         sea_level : float
             Sea level for the concerned year
 
@@ -52,17 +60,19 @@ class ProfileView():
         None.
 
         """
-        self.canvas = ctk.CTkCanvas(frame, width=width, height=height, bg="white")
+        if self.canvas is None or not self.canvas.winfo_exists() or self.canvas.master is not frame:
+            if self.redraw_scheduler is not None:
+                self.redraw_scheduler.cancel()
+            self.canvas = ctk.CTkCanvas(frame, width=width, height=height, bg="white")
+            self.redraw_scheduler = RedrawScheduler(self.canvas, self.redraw)
+            self.canvas.bind("<Configure>", self.on_resize)
         self.canvas.pack(fill=ctk.BOTH, expand=True)
         
-        self.dico_per_long = dict(sorted(dico_per_long.items()))
-        self.max_elevation = max(self.dico_per_long.values(), default=1)
-        self.sea_level = sea_level
-        self.load_sky_image() #Background image
+        self.set_profile(dico_per_long, sea_level)
+        if self.sky_image is None:
+            self.load_sky_image() #Background image (loaded once)
         self.redraw()
         
-        self.canvas.bind("<Configure>", self.on_resize)
-        
     # original code for that has now been replaced with redraw
     # def draw_profile(self):
     #     margin_x = 20       # horizontal margin (on left and right) -nb of pixels
@@ -122,9 +132,36 @@ class ProfileView():
             self.sky_image = None #Works without image if issue with it
 #---------------------------------------------------------------------------------#
 
+    def layer(self, name, key, build):
+        """
+        Return a cached layer of the drawing, built again only if its inputs (key) changed.
+
+        Parameters
+        ----------
+        name : str
+            name of the layer ('sky', 'terrain', 'axis' or 'sea')
+        key : tuple
+            inputs of the layer (size of the canvas, profile...)
+        build : function
+            creates the layer (PIL.Image) from the current inputs
+
+        Returns
+        -------
+        PIL.Image
+            image of the layer
+        """
+        cached_key, image = self.layers.get(name, (None, None))
+        if cached_key != key:
+            image = build()
+            self.layers[name] = (key, image)
+        return image
+
     def redraw(self):
         """
-        Draw the profile view and adapt it to the window's size
+        Draw the profile view and adapt it to the window's size.
+        The drawing is made of cached layers (sky, terrain, axis and sea), which are only built again when
+        their inputs change: the terrain only depends on the profile and the size, so a change of the sea level
+        only moves the sky, the sea and its label, and a resize of the window rescales each layer once.
 
         Returns
         -------
@@ -137,74 +174,86 @@ class ProfileView():
 #-----------------------------Made with help of AI----------------------------#
         img_width = self.canvas.winfo_width()
         img_height = self.canvas.winfo_height()
+        size = (img_width, img_height)
     
         top_margin = 50     # Reserve 50 pixels at the top
         bottom_margin = 100  # Reserve 100 pixels at the bottom
         usable_height = img_height - top_margin - bottom_margin
         display_max_elevation = self.max_elevation
-    
-        image = Image.new("RGB", (img_width, img_height), "white")
+        bar_width = 100
     
         # Calculate sea level position with top_margin offset
         sea_y = int(top_margin + usable_height * (1 - self.sea_level / display_max_elevation))
+
+        def build_terrain():
+            # Polygon that shapes the land, on a transparent layer
+            terrain = Image.new("RGBA", size, (0, 0, 0, 0))
+            draw = ImageDraw.Draw(terrain)
+
+            longs = list(self.dico_per_long.keys())
+            elevations = list(self.dico_per_long.values())
+        
+            min_long = min(longs)
+            max_long = max(longs)
+            long_range = max_long - min_long if max_long != min_long else 1
+        
+            points = []
+            #Initialize the points' coordinates in adequation with the window's size
+            for i, lon in enumerate(longs):
+                x = int((lon - min_long) / long_range * img_width)
+                elev = elevations[i]
+                y = int(top_margin + usable_height * (1 - elev / display_max_elevation))
+                points.append((x, y))
+        
+            if points:
+                fill_area = points + [(points[-1][0], img_height), (points[0][0], img_height)]
+                draw.polygon(fill_area, fill=(0, 102, 51))
+            return terrain
+
+        def build_axis():
+            # White vertical strip with the y-axis ticks every 200 meters
+            axis = Image.new("RGB", (bar_width + 1, img_height), "white")
+            draw = ImageDraw.Draw(axis)
+            tick_interval = 200
+            max_tick_value = ((self.max_elevation // tick_interval) + 1) * tick_interval
+            
+            #Indicate the meters so that the user can see the elevation's value
+            tick_value = 0
+            while tick_value <= max_tick_value:
+                y = int(top_margin + usable_height * (1 - tick_value / display_max_elevation))
+                draw.text((12, y - 7), f"{tick_value} m", fill="black", font=self.axis_font)
+                draw.line([(bar_width - 10, y), (bar_width, y)], fill="black", width=1)
+                tick_value += tick_interval
+            return axis
+
+        terrain = self.layer('terrain', (size, self.profile_version, display_max_elevation), build_terrain)
+        axis = self.layer('axis', (img_height, self.max_elevation), build_axis)
+        sea = self.layer('sea', size, lambda: Image.new("RGB", size, (0, 0, 255)))
+
+        image = Image.new("RGB", size, "white")
     
-        # Draw sky
+        # Draw sky (stretched down to the sea level, from a copy of the image reduced once to the size of the window)
         if self.sky_image and sea_y > top_margin:
-            resized_sky = self.sky_image.resize((img_width, sea_y))
-            image.paste(resized_sky, (0, 0))
-    
-        draw = ImageDraw.Draw(image)
+            sky = self.layer('sky', size, lambda: self.sky_image.resize(size))
+            image.paste(sky.resize((img_width, sea_y)), (0, 0))
     
         # Draw elevation profile
-        longs = list(self.dico_per_long.keys())
-        elevations = list(self.dico_per_long.values())
-    
-        min_long = min(longs)
-        max_long = max(longs)
-        long_range = max_long - min_long if max_long != min_long else 1
-    
-        points = []
-        #Initialize the points' coordinates in adequation with the window's size
-        for i, lon in enumerate(longs):
-            x = int((lon - min_long) / long_range * img_width)
-            elev = elevations[i]
-            y = int(top_margin + usable_height * (1 - elev / display_max_elevation))
-            points.append((x, y))
-    
-        if points:
-            fill_area = points + [(points[-1][0], img_height), (points[0][0], img_height)]
-            #Draw the polygon that shapes the land 
-            draw.polygon(fill_area, fill=(0, 102, 51))
-    
-        draw.line([(0, sea_y), (img_width, sea_y)], fill="blue", width=2)
-    
-        # Below-sea overlay
-        overlay = Image.new("RGB", (img_width, img_height), (0, 0, 255))
-        mask = Image.new("L", (img_width, img_height), 0)
-        mask_draw = ImageDraw.Draw(mask)
-        mask_draw.rectangle([(0, sea_y), (img_width, img_height)], fill=80)
-        image = Image.composite(overlay, image, mask)
+        image.paste(terrain, (0, 0), terrain)
     
         draw = ImageDraw.Draw(image)
+        draw.line([(0, sea_y), (img_width, sea_y)], fill="blue", width=2)
     
-        # Draw white vertical strip (5% of width)
-        bar_width = 100
-        draw.rectangle([(0, 0), (bar_width, img_height)], fill="white")
+        # Below-sea overlay (blue with an opacity of 80/255)
+        below = (0, min(max(sea_y, 0), img_height), img_width, img_height)
+        if below[1] < img_height:
+            image.paste(Image.blend(image.crop(below), sea.crop(below), 80 / 255), below[:2])
     
-        # Y-axis ticks every 200 meters
-        tick_interval = 200
-        max_tick_value = ((self.max_elevation // tick_interval) + 1) * tick_interval
-        
-        #Indicate the meters so that the user can see the elevation's value
-        tick_value = 0
-        while tick_value <= max_tick_value:
-            y = int(top_margin + usable_height * (1 - tick_value / display_max_elevation))
-            draw.text((12, y - 7), f"{tick_value} m", fill="black", font=self.axis_font)
-            draw.line([(bar_width - 10, y), (bar_width, y)], fill="black", width=1)
-            tick_value += tick_interval
+        # Draw white vertical strip with the ticks
+        image.paste(axis, (0, 0))
     
         # Draw sea level tick and label in blue
         #Indicate the value of the see level
+        draw = ImageDraw.Draw(image)
         draw.text((bar_width+20, sea_y), f"Sea level: {float(self.sea_level)} m", fill="white", font=self.axis_font)
         #draw.text((bar_width+25, sea_y), f"{int(self.sea_level)} m", fill="white", font=self.axis_font)
     
@@ -215,12 +264,64 @@ class ProfileView():
         self.canvas.delete("all")
         self.canvas.create_image(0, 0, anchor="nw", image=self.photo)
 
+    def set_profile(self, dico_per_long, sea_level):
+        """
+        Change the profile and the sea level of the drawing. The terrain layer is only built again
+        if the profile is different (the profile does not depend on the sea level).
+
+        Parameters
+        ----------
+        dico_per_long : dict
+            Dictionary containing the longitudes and their associated elevation
+        sea_level : float
+            Sea level for the concerned year
+
+        Returns
+        -------
+        None.
+        """
+        dico_per_long = dict(sorted(dico_per_long.items()))
+        if dico_per_long != self.dico_per_long:
+            self.dico_per_long = dico_per_long
+            self.max_elevation = max(self.dico_per_long.values(), default=1)
+            self.profile_version += 1
+        self.sea_level = sea_level
+
+    def is_displayed(self):
+        """
+        Check if the canvas of the profile view exists and is packed in its frame.
+
+        Returns
+        -------
+        bool
+            True if the profile view is displayed
+        """
+        return (self.canvas is not None and self.canvas.winfo_exists()
+                and self.canvas.winfo_manager() == "pack")
+
+    def set_sea_level(self, sea_level):
+        """
+        Change the sea level of the drawing, for example when the year changes: only the sky, the sea
+        and its label are drawn again (see redraw), at most once per frame (see RedrawScheduler).
+
+        Parameters
+        ----------
+        sea_level : float
+            Sea level for the concerned year
+
+        Returns
+        -------
+        None.
+        """
+        self.sea_level = sea_level
+        self.redraw_scheduler.request()
+
     def on_resize(self, event):
         """
-        Reinitialize the drawing.
+        Reinitialize the drawing, at most once per frame with the latest size (see RedrawScheduler).
         
         Returns
         -------
         None.
         """
-        self.redraw()
+        self.redraw_scheduler.request()
@@ -0,0 +1,76 @@
+import time
+
+
+class RedrawScheduler:
+    def __init__(self, widget, redraw, frame_time=16):
+        """
+        Coalesce the requests of redraw of a widget: many events (resize of the window, turns of the mouse wheel...)
+        only change the state of the drawing (zoom, pan, size) and ask for a redraw, and the drawing is done
+        at most once per frame of the display, with the latest state. The requests received while a redraw
+        is pending are counted as coalesced.
+
+        Parameters
+        ----------
+        widget : tkinter widget
+            widget used to schedule the redraw (after_idle / after)
+        redraw : function
+            function drawing the widget with its current state
+        frame_time : int
+            minimum time in milliseconds between two redraws
+        """
+        self.widget = widget
+        self.redraw = redraw
+        self.frame_time = frame_time
+
+        self.job = None          # pending redraw
+        self.last_redraw = 0     # time of the last redraw (time.perf_counter)
+
+        # statistics
+        self.requests = 0        # number of redraws requested
+        self.redraws = 0         # number of redraws done
+        self.coalesced = 0       # requests merged into a pending redraw
+
+    def request(self):
+        """
+        Ask for a redraw: it is done when the interface is idle, or at the next frame if the last redraw
+        was less than frame_time ms ago. Nothing is added if a redraw is already pending.
+
+        Returns
+        -------
+        None.
+        """
+        self.requests += 1
+        if self.job is not None:
+            self.coalesced += 1
+            return
+
+        wait = self.frame_time - (time.perf_counter() - self.last_redraw) * 1000
+        if wait > 0:
+            self.job = self.widget.after(int(wait) + 1, self.run)
+        else:
+            self.job = self.widget.after_idle(self.run)
+
+    def run(self):
+        """
+        Do the pending redraw.
+
+        Returns
+        -------
+        None.
+        """
+        self.job = None
+        self.last_redraw = time.perf_counter()
+        self.redraws += 1
+        self.redraw()
+
+    def cancel(self):
+        """
+        Cancel the pending redraw (for example when the widget is destroyed).
+
+        Returns
+        -------
+        None.
+        """
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
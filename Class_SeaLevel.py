@@ -1,10 +1,19 @@
 import csv
 
+import numpy as np
+
 class SeaLevel:
     def __init__(self):
         self.dico_sea_level = {}
         self.load_data_sea_level("Sea_level_rise.csv")
 
+        # Coefficients (a, b) of the model sea_level = a * year**b of each IPCC scenario,
+        # shared by compute_sea_level_i (one year) and sea_levels (an array of years)
+        self.coefficients = {1: (6 * 10.0**(-82), 24.366),
+                             2: (7 * 10.0**(-91), 27.078),
+                             3: (1 * 10.0**(-107), 32.127),
+                             4: (3 * 10.0**(-128), 38.388)}
+
     def load_data_sea_level(self, file_sea_level, jump_first_line = True):
         """
         Load the data from a file containing the average sea level on Earth for all past years since 1950. 
@@ -47,7 +56,8 @@ class SeaLevel:
         sea_level:  float 
         value of the average sea level elevation for the given year 
 	"""
-        return round(6*(10**(-82))*year**24.366,3)
+        a, b = self.coefficients[1]
+        return round(a*year**b,3)
     
     def compute_sea_level_2(self, year):
         """
@@ -62,7 +72,8 @@ class SeaLevel:
         sea_level:  float 
         value of the average sea level elevation for the given year 
 	"""
-        return round(7*(10**(-91))*year**27.078,3)
+        a, b = self.coefficients[2]
+        return round(a*year**b,3)
     
     def compute_sea_level_3(self, year):
         """
@@ -77,7 +88,8 @@ class SeaLevel:
         sea_level:  float 
         value of the average sea level elevation for the given year 
 	"""
-        return round(1*(10**(-107))*year**32.127,3)
+        a, b = self.coefficients[3]
+        return round(a*year**b,3)
     
     def compute_sea_level_4(self, year):
         """
@@ -92,7 +104,8 @@ class SeaLevel:
         sea_level:  float 
         value of the average sea level elevation for the given year 
 	"""
-        return round(3*(10**(-128))*year**38.388,3)
+        a, b = self.coefficients[4]
+        return round(a*year**b,3)
 
     def retrieve_sea_level(self, year, scenario):
         """
@@ -132,6 +145,86 @@ class SeaLevel:
         
         return sea_level
 
+    def sea_levels(self, years, scenario):
+        """
+        Vectorised version of retrieve_sea_level: sea level of all the years of an array at once for a scenario.
+        The measured values of dico_sea_level are used for the years they contain, the model of the scenario
+        for the others.
+
+        Parameters:
+        ----------
+        years: numpy array
+        years at which we want to retrieve the sea level
+        scenario: int
+        IPCC scenario chosen by the user
+
+        Returns:
+        ----------
+        sea_levels: numpy array
+        value of the sea level elevation for each year
+        """
+        years = np.asarray(years)
+        a, b = self.coefficients[scenario]
+        sea_levels = np.round(a * years.astype(np.float64) ** b, 3)
+
+        # Replace the values of the years which were measured
+        known_years = np.array(sorted(self.dico_sea_level), dtype=np.int64)
+        if len(known_years):
+            known_levels = np.array([self.dico_sea_level[year] for year in known_years])
+            position = np.minimum(np.searchsorted(known_years, years), len(known_years) - 1)
+            measured = known_years[position] == years
+            sea_levels = np.where(measured, known_levels[position], sea_levels)
+        return sea_levels
+
+    def levels_per_year(self, scenario, years):
+        """
+        Highest sea level reached up to each year of a list of increasing years, for a scenario.
+        The measured sea level can go down from one year to the next, so the running maximum is used:
+        it never decreases and a point which has been under water once is counted as submerged.
+
+        Parameters:
+        ----------
+        scenario: int
+        IPCC scenario chosen by the user
+        years: list
+        increasing years (for example every 5 years from 1950 to 2445)
+
+        Returns:
+        ----------
+        levels: numpy array
+        highest sea level in meters reached up to each year
+        """
+        return np.maximum.accumulate(self.sea_levels(years, scenario))
+
+    def first_year_table(self, levels, years, lowest, highest):
+        """
+        Invert the curve of the sea level: for each elevation in whole meters from lowest to highest,
+        find the first year in which the sea level reaches it. A point at elevation e is under water
+        when e <= sea level, i.e. when floor(sea level) >= e, so the years are found with a binary search
+        in the increasing levels.
+
+        Parameters:
+        ----------
+        levels: numpy array
+        highest sea level reached up to each year (see levels_per_year)
+        years: list
+        years of the levels
+        lowest, highest: int
+        range of elevations in meters of the table
+
+        Returns:
+        ----------
+        table: numpy array
+        first year (uint16) for each elevation from lowest to highest, 65535 if it is never under water
+        """
+        elevations = np.arange(lowest, highest + 1)
+        position = np.searchsorted(np.floor(levels), elevations, side='left')
+
+        table = np.full(len(elevations), 65535, dtype=np.uint16)
+        reached = position < len(years)
+        table[reached] = np.asarray(years)[position[reached]]
+        return table
+
 # if __name__ == "__main__":
 #      app = SeaLevel()
 #      print(app.retrieve_sea_level(2025,1))
@@ -1,99 +1,190 @@
-import netCDF4 as nc               
-import numpy as np                
 from PIL import Image, ImageTk 
 import customtkinter as ctk
 import tkinter as tk
 
+from Class_RedrawScheduler import RedrawScheduler
+
 
 
 class SecondaryView:
     def __init__(self, controller):
         self.controller = controller
-        self.netcdf_file = "ETOPO_2022_v1_60s_N90W180_bed.nc"
+        self.engine = controller.engine              # computations of the maps (no tkinter)
+        self.map_renderer = self.engine.map_renderer # renders the map at the resolution of the zoom
         
         # These will be set when generate_base_image() is called
         self.base_image = None      # PIL Image representing the map with sea level coloring
+        self.preview_image = None   # Low resolution image of the whole map shown instead of base_image (see show_preview)
         self.photo = None           # Tkinter-compatible PhotoImage for displaying on canvas
+        self.canvas = None          # Canvas of the map, set by create_map()
+        self.redraw_scheduler = None  # Coalesces the redraws of the canvas (resize, zoom), set by create_map()
+        self.drag_start = None      # Position of the mouse when the button was pressed
+        self.drag_last = None       # Last position of the mouse during a drag
+        self.dragging = False       # True once the mouse moved more than drag_threshold pixels with the button pressed
+        self.drag_threshold = 5     # Distance in pixels under which a press is a click and not a drag
         self.zoom = 1.0             # Zoom scale factor (1.0 = no zoom)
         self.pan_x = 0              # Horizontal pan offset for image drawing
         self.pan_y = 0              # Vertical pan offset for image drawing
         self.last_water_level = None  # Store the last used water level to avoid unnecessary regeneration
+        self.lat_indices = None     # Indices of the latitude and longitude of each row and column of base_image
+        self.lon_indices = None
 
     def generate_base_image(self, base_width, base_height, sea_level):
         """
-        Generate the base image (PIL.Image) sized (base_width x base_height) showing land and sea colors.
-        Uses elevation data from netCDF file to color pixels blue if below sea level, green if above.
-        Only regenerates if the water level has changed since last call.
+        Generate the base image (PIL.Image) sized (base_width x base_height) showing land and sea colors
+        (see render_base_image) and use it as the image of the map.
 
         Returns
         -------
         None
         """
-        # If image already generated and water level hasn't changed, no need to regenerate
-        if self.base_image is not None and self.water_level == sea_level:
-            return
-        
-        # Get current sea level for given year and scenario
-        self.water_level = sea_level
-        
+        self.show_base_image(self.render_base_image(base_width, base_height, sea_level), sea_level)
+
+    def render_base_image(self, base_width, base_height, sea_level):
+        """
+        Ask the engine for the base image (PIL.Image) sized (base_width x base_height) showing land and sea colors
+        (see SimulationEngine.render_map).
+        This method does not use tkinter nor change the displayed map, so it can run in a background thread.
+
+        Returns
+        -------
+        PIL.Image
+            base image of the map for this sea level
+        """
         # In case the canvas width and height in mainframe are not available
         if base_width <= 1 or base_height <= 1:
             base_width, base_height = 800, 600
-        
-        # Open the netCDF elevation dataset and read latitude, longitude, and elevation arrays
-        with nc.Dataset(self.netcdf_file) as ds:
-            lats = np.array(ds.variables['lat'])   # 1D array of latitudes
-            lons = np.array(ds.variables['lon'])  # 1D array of longitudes
-            elevs = np.array(ds.variables['z'])     # 2D array of elevations (lat x lon)
+
+        return self.engine.render_map(base_width, base_height, sea_level)
+
+    def show_base_image(self, image, sea_level):
+        """
+        Use a rendered base image as the image of the map.
+
+        Parameters
+        ----------
+        image : PIL.Image
+            base image returned by render_base_image
+        sea_level : float
+            sea level of the image
+
+        Returns
+        -------
+        None.
+        """
+        self.base_image = image
+        self.preview_image = None
+        self.water_level = sea_level
+        self.set_indices(image.width, image.height)
+
+    def set_indices(self, base_width, base_height):
+        """
+        Store the latitudes, the longitudes and the indices sampled for a base image of size
+        (base_width x base_height), used to convert the canvas coordinates into geographical coordinates.
+        Nothing is done if they already correspond to this size.
+
+        Returns
+        -------
+        None.
+        """
+        if self.lat_indices is not None and len(self.lat_indices) == base_height and len(self.lon_indices) == base_width:
+            return
+
+        lats, lons, lat_indices, lon_indices = self.engine.grid_indices(base_width, base_height)
         
         # Save lat/lon arrays to instance variables for coordinate converter (canvas to geo)
         self.lats = lats
         self.lons = lons
         
-        # reverse the lattitude (north to south) to match image coordinates and space evenly coordinates
-        lat_indices = np.linspace(len(lats)-1, 0, base_height).round().astype(int)
-        lon_indices = np.linspace(0, len(lons)-1, base_width).round().astype(int)
-        
         self.lat_indices = lat_indices #useful later for the canvas coordinate to geographical coordinate
         self.lon_indices = lon_indices
 
-        
-        # Create dictionnary with elev as key and lat lon as values
-        #-------------------------original code-------------------------------#
-        # elev = np.zeros((base_height, base_width)) #like initialising dico
-        # for i in range(base_height):
-        #     for j in range(base_width):
-        #         elev[i, j] = elevs[lat_indices[i], lon_indices[j]]
+    def visible_part(self):
+        """
+        Compute the size of the zoomed map and the part of it visible on the canvas.
 
-        #------------------------improved by AI-------------------------------#
-        elev = elevs[lat_indices[:, None], lon_indices[None, :]]
-        print(f"[SECONDARYVIEW] Elevation stats: min={np.min(elev)}, max={np.max(elev)}, mean={np.mean(elev)}")
+        Returns
+        -------
+        new_w, new_h : int
+            size in pixels of the whole map with the current zoom
+        x0, y0, x1, y1 : int
+            limits in pixels of the visible part on the canvas
+        """
+        # Get current canvas size (width and height in pixels)
+        w = self.canvas.winfo_width()
+        h = self.canvas.winfo_height()
 
+        # Calculate the scaled image size by applying current zoom factor
+        new_w = max(1, int(w * self.zoom))  # width after zoom, at least 1 pixel
+        new_h = max(1, int(h * self.zoom))  # height after zoom, at least 1 pixel
 
-        # Create an empty array for the RGB image data (height, width, 3 color channels)
-        array = np.empty((base_height, base_width, 3), dtype=np.uint8)
-        
-        # define the colour depending on whether above or below water
-        water_rgb = (25, 25, 112)
-        land_rgb= (94, 200, 80) #very dark  (31, 120, 50), kinda blue (80, 200, 120) 
-        below = (elev <= self.water_level)
-        print(f"[SECONDARYVIEW] Number of below-sea-level points: {np.sum(below)} out of {below.size}")
-
-        array[below] = water_rgb
-        array[~below] = land_rgb
-    
-        #array[..., 0] = 0                       # Set red channel to zero everywhere (no red)
-        #array[..., 1] = np.where(below, 0, 255) # Set green channel: 255 where above water, 0 where below
-        #array[..., 2] = np.where(below, 255, 0) # Set blue channel: 255 where below water, 0 where above
+        # Part of the zoomed image visible on the canvas
+        x0 = max(0, int(self.pan_x))
+        y0 = max(0, int(self.pan_y))
+        x1 = min(w, int(self.pan_x) + new_w)
+        y1 = min(h, int(self.pan_y) + new_h)
+        return new_w, new_h, x0, y0, x1, y1
+
+    def is_displayed(self):
+        """
+        Check if the canvas of the map exists and is packed in its frame
+        (it is only unpacked while the profile view is displayed).
+
+        Returns
+        -------
+        bool
+            True if the map is displayed
+        """
+        return (self.canvas is not None and self.canvas.winfo_exists()
+                and self.canvas.winfo_manager() == "pack")
+
+    def show_preview(self, image):
+        """
+        Draw a low resolution image of the whole map (for example while the slider of the years is dragged)
+        with the current zoom and pan, without changing the base image: only the visible part is enlarged.
+        The preview stays on the canvas when it is redrawn (resize, zoom...) until a new base image is shown.
 
-        # Create a PIL Image from the RGB numpy array
-        self.base_image = Image.fromarray(array, mode='RGB')
+        Parameters
+        ----------
+        image : PIL.Image
+            image of the whole map, of any size
+
+        Returns
+        -------
+        None.
+        """
+        self.preview_image = image
+        self.redraw()
+
+    def draw_preview(self, image):
+        """
+        Draw the visible part of the preview image, enlarged to the zoom (see show_preview).
+
+        Returns
+        -------
+        None.
+        """
+        new_w, new_h, x0, y0, x1, y1 = self.visible_part()
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        # Visible part in pixels of the small image
+        scale_x = image.width / new_w
+        scale_y = image.height / new_h
+        box = ((x0 - self.pan_x) * scale_x, (y0 - self.pan_y) * scale_y,
+               (x1 - self.pan_x) * scale_x, (y1 - self.pan_y) * scale_y)
+
+        self.canvas.delete("all")
+        self.map_photo = ImageTk.PhotoImage(image.resize((x1 - x0, y1 - y0), Image.NEAREST, box=box))
+        self.canvas.create_image(x0, y0, anchor="nw", image=self.map_photo)
 
     def redraw(self):
         """
         Redraw the base image on the canvas, applying zoom and pan offsets.
         This method handles scaling the base image to fit current zoom and placing it
         correctly on the canvas based on pan_x and pan_y.
+        When zoomed in (and once the pyramid is loaded), only the visible part is rendered from the tiles
+        at the resolution of the zoom instead of enlarging the pixels of the base image.
         
         Returns
         -------
@@ -103,6 +194,11 @@ class SecondaryView:
         if self.base_image is None:
             return
 
+        # A preview of another year is shown until the map of this year is ready
+        if self.preview_image is not None:
+            self.draw_preview(self.preview_image)
+            return
+
         # Clear previous drawings on canvas
         self.canvas.delete("all")
         
@@ -110,13 +206,18 @@ class SecondaryView:
         #------reusing them in on resize but as we need to redefine-----------#
         #------them for each resize it would be pointless to do so------------#
         
-        # Get current canvas size (width and height in pixels)
-        w = self.canvas.winfo_width()
-        h = self.canvas.winfo_height()
-
-        # Calculate the scaled image size by applying current zoom factor
-        new_w = max(1, int(w * self.zoom))  # width after zoom, at least 1 pixel
-        new_h = max(1, int(h * self.zoom))  # height after zoom, at least 1 pixel
+        # Size of the zoomed image and part of it visible on the canvas
+        new_w, new_h, x0, y0, x1, y1 = self.visible_part()
+        
+        if self.zoom > 1 and self.map_renderer.ready and x1 > x0 and y1 > y0:
+            # Render only the visible part, from the level of the pyramid matching the zoom
+            visible_image = self.engine.render_viewport(self.water_level,
+                                                        (x0 - self.pan_x) / new_w, (y0 - self.pan_y) / new_h,
+                                                        (x1 - self.pan_x) / new_w, (y1 - self.pan_y) / new_h,
+                                                        x1 - x0, y1 - y0)
+            self.map_photo = ImageTk.PhotoImage(visible_image)
+            self.canvas.create_image(x0, y0, anchor="nw", image=self.map_photo)
+            return
 
         # resize the baseimage using nearest neighbour method (=fastest but blocky, use Image.BICUBIC for best quality)
         resized_base_image = self.base_image.resize((new_w, new_h), Image.NEAREST)
@@ -134,7 +235,7 @@ class SecondaryView:
         """
         Resize the window according to the zoom chosen by the user with its mouse scroll.
         Recalculate the pan offsets to center the zoomed image within the new canvas size.
-        Then redraw the map.
+        Then ask for a redraw of the map (see RedrawScheduler).
         
         Returns
         -------
@@ -148,8 +249,8 @@ class SecondaryView:
         self.pan_x = (w - new_w) / 2
         self.pan_y = (h - new_h) / 2
         
-        # Redraw the canvas with updated pan
-        self.redraw()
+        # Redraw the canvas with updated pan (at most once per frame, with the latest size)
+        self.redraw_scheduler.request()
 
     def on_zoom(self, event):
         """
@@ -165,8 +266,7 @@ class SecondaryView:
             return
 #----------------------------Created with help of AI--------------------------#
 
-        # Update canvas geometry info to get current size
-        self.canvas.update_idletasks()
+        # Current size of the canvas (update_idletasks is not called: it would run the pending redraw at each event)
         canvas_w = self.canvas.winfo_width()
         canvas_h = self.canvas.winfo_height()
     
@@ -199,10 +299,83 @@ class SecondaryView:
         self.pan_x = mx - ix * new_zoom
         self.pan_y = my - iy * new_zoom
     
-        # Redraw the image with new zoom and pan
-        self.redraw()
+        # Redraw the image with new zoom and pan (at most once per frame, with the latest zoom)
+        self.redraw_scheduler.request()
 #-----------------------------------------------------------------------------#
 
+    def on_press(self, event):
+        """
+        Start a click or a drag when the left button of the mouse is pressed.
+
+        Returns
+        -------
+        None.
+        """
+        self.drag_start = (event.x, event.y)
+        self.drag_last = (event.x, event.y)
+        self.dragging = False
+
+    def on_drag(self, event):
+        """
+        Pan the map while the mouse moves with the left button pressed.
+        The image already drawn is only moved on the canvas (canvas.move), it is not rendered again:
+        the parts of the map which appear are rendered when the button is released.
+
+        Returns
+        -------
+        None.
+        """
+        if self.drag_start is None or self.base_image is None:
+            return
+
+        # A small movement is still a click
+        if not self.dragging:
+            if abs(event.x - self.drag_start[0]) + abs(event.y - self.drag_start[1]) < self.drag_threshold:
+                return
+            self.dragging = True
+
+        # Movement since the last event, limited so that the map still covers the canvas
+        new_w, new_h = self.canvas.winfo_width() * self.zoom, self.canvas.winfo_height() * self.zoom
+        pan_x = self.clamp_pan(self.pan_x + event.x - self.drag_last[0], self.canvas.winfo_width(), new_w)
+        pan_y = self.clamp_pan(self.pan_y + event.y - self.drag_last[1], self.canvas.winfo_height(), new_h)
+        self.canvas.move("all", int(pan_x) - int(self.pan_x), int(pan_y) - int(self.pan_y))
+        self.pan_x, self.pan_y = pan_x, pan_y
+        self.drag_last = (event.x, event.y)
+
+    def on_release(self, event):
+        """
+        End a click or a drag when the left button of the mouse is released: a click checks if the user clicked
+        on a country (see on_click), a drag renders the map at its new position (the tiles already visible
+        are in the cache of tiles, so only the parts which appeared are rendered).
+
+        Returns
+        -------
+        None.
+        """
+        if self.drag_start is None:
+            return
+        if self.dragging:
+            self.redraw_scheduler.request()
+        else:
+            self.on_click(event)
+        self.drag_start = None
+        self.dragging = False
+
+    @staticmethod
+    def clamp_pan(pan, canvas_size, image_size):
+        """
+        Limit a pan offset so that a map larger than the canvas always covers it
+        (a smaller map can move freely).
+
+        Returns
+        -------
+        float
+            pan offset in pixels
+        """
+        if image_size < canvas_size:
+            return pan
+        return min(0, max(canvas_size - image_size, pan))
+
     def on_click(self, event):
         """
         Check if the user clicked on a country for which a profile view is available.
@@ -223,7 +396,7 @@ class SecondaryView:
         print(f" [SECONDARYVIEW] Clicked at: ({self.x}, {self.y})")
         self.controller.create_profile_map()
         
-    def create_map(self, frame, width, height, sea_level):
+    def create_map(self, frame, width, height, sea_level, base_image=None):
         """
         Create and set up the Ctkinter canvas with the base image loaded and display it.
         Also binds resize and zoom events to allow the user to interact with the interface.
@@ -237,18 +410,27 @@ class SecondaryView:
             height of the frame
         sea_level : float
             value of the sea level at the year chosen by the user
+        base_image : PIL.Image
+            base image already rendered (in the background) for this sea level,
+            if None it is generated now
         
         Returns
         -------
         None.
         """
-        print(f"[SECONDARYVIEW] Generating image with sea level: {sea_level}")
-        # Generate or update the base image for the given parameters
-        self.generate_base_image(width, height, sea_level)
+        if base_image is None:
+            print(f"[SECONDARYVIEW] Generating image with sea level: {sea_level}")
+            # Generate or update the base image for the given parameters
+            self.generate_base_image(width, height, sea_level)
+        else:
+            self.show_base_image(base_image, sea_level)
 
         # Create a Tkinter Canvas widget in the provided parent frame
+        if self.redraw_scheduler is not None:
+            self.redraw_scheduler.cancel()
         self.canvas = tk.Canvas(frame, width=width, height=height, bg="white")
         self.canvas.pack(fill=ctk.BOTH, expand=True)
+        self.redraw_scheduler = RedrawScheduler(self.canvas, self.redraw)
 
         # Bind the canvas size change event to on_resize for dynamic resizing behavior
         self.canvas.bind("<Configure>", self.on_resize)
@@ -256,8 +438,10 @@ class SecondaryView:
         # Bind mouse wheel events to on_zoom for zooming functionality
         self.canvas.bind("<MouseWheel>", self.on_zoom)
         
-        #Bind the canvas to a click on the map
-        self.canvas.bind("<Button-1>", self.on_click)
+        #Bind the canvas to a click on the map, or a drag to pan the map
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_release)
         
         print("Map created, showing shape:", self.base_image.size)
 
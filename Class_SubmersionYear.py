@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+from Class_ElevationCache import ElevationCache
+
+logger = logging.getLogger(__name__)
+
+
+class SubmersionYear:
+    def __init__(self, flood_level, sea_level, years=range(1950, 2446, 5)):
+        """
+        Year of first submersion of each point of the elevation grid, one raster per IPCC scenario:
+        the first year in which the sea level reaches the flood level of the point (see FloodLevel).
+        The map of a year is then only first_year <= year, without converting the year into a sea level
+        and comparing it to the elevations again.
+        The first year uses the highest sea level reached up to each year (see SeaLevel.levels_per_year):
+        in the years when the measured sea level went down, first_year <= year also counts the points reached
+        in an earlier year, so the map of these years must be compared with the sea level of the year instead
+        (see level_reached).
+        The rasters are stored as .npy files (uint16, 65535 = never under water) in the folder of the cache.
+        The name of a file contains a short hash of the sea levels of the scenario, so a raster is computed
+        again if the sea level data change.
+
+        Parameters
+        ----------
+        flood_level : FloodLevel
+            flood level of each point of the decimated elevation grid
+        sea_level : SeaLevel
+            sea level of each year for each scenario
+        years : list
+            years of the slider of the interface
+        """
+        self.flood_level = flood_level
+        self.sea_level = sea_level
+        self.years = list(years)
+
+        self.rasters = {}   # scenario → raster of the first years (memory-mapped, uint16)
+
+    def path(self, scenario, levels):
+        """
+        Name of the .npy file of the raster of a scenario.
+
+        Parameters
+        ----------
+        scenario : int
+            IPCC scenario
+        levels : numpy array
+            sea level of each year of the scenario
+
+        Returns
+        -------
+        str
+            path of the file in the folder of the cache
+        """
+        key = hashlib.sha1(np.asarray(levels, dtype=np.float64).tobytes()).hexdigest()[:12]
+        return os.path.join(self.flood_level.elevation_cache.cache_dir,
+                            f"first_year_{scenario}_{self.flood_level.step}_{key}.npy")
+
+    def load(self, scenario):
+        """
+        Map the raster of a scenario from the folder of the cache, computing it if it is missing.
+
+        Parameters
+        ----------
+        scenario : int
+            IPCC scenario
+
+        Returns
+        -------
+        numpy array
+            2D array (uint16) of the first year under water of each point of the decimated grid
+        """
+        if scenario in self.rasters:
+            return self.rasters[scenario]
+
+        flood = self.flood_level.load()
+        levels = self.sea_level.levels_per_year(scenario, self.years)
+        path = self.path(scenario, levels)
+
+        if not os.path.exists(path):
+            # First year of each elevation, then of each point by looking up its flood level in the table
+            lowest, highest = int(np.min(flood)), int(np.max(flood))
+            table = self.sea_level.first_year_table(levels, self.years, lowest, highest)
+            raster = table[np.asarray(flood, dtype=np.int32) - lowest]
+            ElevationCache.save_atomic(path, raster)
+            logger.info("Raster of the scenario %s built", scenario)
+
+        self.rasters[scenario] = np.load(path, mmap_mode='r')
+        return self.rasters[scenario]
+
+    def submerged(self, scenario, year):
+        """
+        Points of the decimated grid under water in a year.
+
+        Parameters
+        ----------
+        scenario : int
+            IPCC scenario
+        year : int
+            year chosen by the user
+
+        Returns
+        -------
+        numpy array
+            2D array of booleans, True if the point is under water
+        """
+        return self.load(scenario) <= year
+
+    def level_reached(self, scenario, year):
+        """
+        Highest sea level reached up to a year, which the raster of the first years uses for this year.
+        Where it is above the sea level of the year, the raster also counts the points which emerged again.
+
+        Parameters
+        ----------
+        scenario : int
+            IPCC scenario
+        year : int
+            year chosen by the user
+
+        Returns
+        -------
+        float
+            highest sea level in meters reached from the first year up to year
+        """
+        levels = self.sea_level.levels_per_year(scenario, self.years)
+        position = int(np.searchsorted(self.years, year, side='right')) - 1
+        if position < 0:
+            return self.sea_level.retrieve_sea_level(year, scenario)
+        return max(float(levels[position]), self.sea_level.retrieve_sea_level(year, scenario))
@@ -0,0 +1,166 @@
+import inspect
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRunner:
+    def __init__(self, max_workers=1):
+        """
+        Run the heavy computations (map generation, number of refugees...) in a background thread,
+        so that the window does not freeze while they run.
+        The results are sent back through a thread-safe queue and the callbacks are only called from
+        the thread of the interface, in poll(). For each kind of task, only the latest request counts:
+        a request which is superseded by a newer one is cancelled if it has not started yet,
+        and its result is dropped otherwise.
+
+        Parameters
+        ----------
+        max_workers : int
+            number of background threads
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.results = queue.Queue()   # (kind, number, callback, on_error, result, error) of the finished tasks
+        self.lock = threading.Lock()
+
+        self.counter = 0      # number of the last request
+        self.latest = {}      # kind of task → number of its latest request
+        self.futures = {}     # kind of task → future of its latest request
+
+        # statistics
+        self.cancelled = 0    # requests cancelled before they started
+        self.dropped = 0      # results of superseded requests which were not used
+
+    def submit(self, kind, callback, function, *args, on_error=None):
+        """
+        Run function(*args) in the background, then callback(result) in the thread of the interface,
+        or on_error(error) if the function raised an exception.
+        The previous request of the same kind is cancelled or its result will be dropped.
+
+        Parameters
+        ----------
+        kind : str
+            kind of task (for example "map" or "refugees")
+        callback : function
+            called with the result of the function, only if no newer request of the same kind was submitted
+        function : function
+            computation to run in the background (it must not use tkinter). If it is a generator,
+            callback is called with each value it yields (for example finer and finer images)
+        *args :
+            arguments of the function
+        on_error : function
+            called in the thread of the interface with the exception if the function failed,
+            for example to restore the state of the interface (the error is only printed if None)
+
+        Returns
+        -------
+        int
+            number of the request
+        """
+        with self.lock:
+            self.counter += 1
+            number = self.counter
+            self.latest[kind] = number
+            previous = self.futures.get(kind)
+            if previous is not None and previous.cancel():
+                self.cancelled += 1
+            self.futures[kind] = self.executor.submit(self.run, kind, number, callback, on_error, function, args)
+        return number
+
+    def cancel(self, kind):
+        """
+        Supersede the latest request of a kind without submitting a new one, for example when the result is
+        already known: the request is cancelled if it has not started yet, and its results are dropped otherwise.
+
+        Parameters
+        ----------
+        kind : str
+            kind of task (for example "map")
+
+        Returns
+        -------
+        None.
+        """
+        with self.lock:
+            self.counter += 1
+            self.latest[kind] = self.counter
+            previous = self.futures.pop(kind, None)
+            if previous is not None and previous.cancel():
+                self.cancelled += 1
+
+    def run(self, kind, number, callback, on_error, function, args):
+        """
+        Run a task in the background thread and put its result in the queue (each of its results for a generator).
+        The task is skipped, or stopped between two results of a generator, if a newer request of the same kind
+        was submitted in the meantime.
+
+        Returns
+        -------
+        None.
+        """
+        if not self.is_latest(kind, number):
+            with self.lock:
+                self.dropped += 1
+            return
+        try:
+            result = function(*args)
+            if not inspect.isgenerator(result):
+                self.results.put((kind, number, callback, on_error, result, None))
+                return
+            for partial_result in result:
+                self.results.put((kind, number, callback, on_error, partial_result, None))
+                if not self.is_latest(kind, number):
+                    with self.lock:
+                        self.dropped += 1
+                    return
+        except Exception as error:
+            self.results.put((kind, number, callback, on_error, None, error))
+
+    def is_latest(self, kind, number):
+        """
+        Check if a request is still the latest one of its kind.
+
+        Returns
+        -------
+        bool
+            True if no newer request of the same kind was submitted
+        """
+        with self.lock:
+            return self.latest.get(kind) == number
+
+    def poll(self):
+        """
+        Call the callbacks of the finished tasks which are still the latest of their kind, or their on_error
+        function if they failed (to be called regularly from the thread of the interface, for example with after()).
+
+        Returns
+        -------
+        None.
+        """
+        while True:
+            try:
+                kind, number, callback, on_error, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if not self.is_latest(kind, number):
+                with self.lock:
+                    self.dropped += 1
+            elif error is not None:
+                logger.error("Error in the task '%s': %s", kind, error)
+                if on_error is not None:
+                    on_error(error)
+            else:
+                callback(result)
+
+    def shutdown(self):
+        """
+        Cancel the tasks which have not started and stop the background threads.
+
+        Returns
+        -------
+        None.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
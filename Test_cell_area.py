@@ -0,0 +1,52 @@
+import shutil
+import tempfile
+
+import numpy as np
+
+from synthetic_grid import load_data
+
+# Check the area of the points of the grid (ElevationData.create_cell_area) on the synthetic grid of synthetic_grid.py.
+# Run this file from the folder of the project.
+
+
+def test_total_area_is_sphere(folder):
+    """
+    Test that the cells of the grid cover the surface of the Earth once, keeping all the points or one point
+    every 4 points: the column at 180° is the column at -180° again and must not be counted.
+    """
+    earth_radius = 6371.0088
+    ok = True
+    for step in (1, 4):
+        elevation_data = load_data(folder, step)
+        nb_columns = elevation_data.grid_shape[1] - elevation_data.duplicate_column
+        total = elevation_data.cell_area.sum() * nb_columns
+        ok = ok and elevation_data.duplicate_column and np.isclose(total, 4 * np.pi * earth_radius ** 2)
+    if ok:
+        print("test_total_area_is_sphere passed")
+    else:
+        print("test_total_area_is_sphere failed")
+
+
+def test_cell_area_of_a_row(folder):
+    """
+    Test that the area of a point of the equator is the area of a cell of 1 degree x 1 degree on the sphere,
+    about 111.2 km x 111.2 km, and that the cells get smaller towards the poles.
+    """
+    earth_radius = 6371.0088
+    elevation_data = load_data(folder)
+    equator = int(np.argmin(np.abs(np.asarray(elevation_data.elevation_cache.load()[0]))))
+    expected = earth_radius ** 2 * np.radians(1.0) * 2 * np.sin(np.radians(0.5))
+    decreasing = np.all(np.diff(elevation_data.cell_area[equator:]) < 0)
+    if np.isclose(elevation_data.cell_area[equator], expected) and decreasing:
+        print("test_cell_area_of_a_row passed")
+    else:
+        print("test_cell_area_of_a_row failed")
+
+
+# Run all tests
+folder = tempfile.mkdtemp()
+try:
+    test_total_area_is_sphere(folder)
+    test_cell_area_of_a_row(folder)
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
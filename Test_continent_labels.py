@@ -0,0 +1,44 @@
+import shutil
+import tempfile
+
+from shapely.geometry import Point
+
+from synthetic_grid import load_data
+
+# Compare the raster of the continents (ElevationData.create_continent_labels) with a test of the points
+# of the grid against the polygons of the continents, on the synthetic grid of synthetic_grid.py.
+# Run this file from the folder of the project.
+
+
+def test_continent_labels_match_polygons(elevation_data):
+    """
+    Test that each point of the raster gets the number of the first polygon which contains it,
+    or 255 if it is in no continent, like the tests with shapely in the original compute_refugees.
+    """
+    lats, lons, _ = elevation_data.elevation_cache.load()
+    polygons = list(elevation_data.create_continent_polygons().values())
+    labels = elevation_data.create_continent_labels()
+
+    ok = labels.shape == elevation_data.grid_shape
+    for row in range(0, len(lats), 3):
+        for col in range(0, len(lons), 3):
+            point = Point(lons[col], lats[row])
+            expected = 255
+            for number, polygon in enumerate(polygons):
+                if polygon.contains(point):
+                    expected = number
+                    break
+            ok = ok and labels[row, col] == expected
+    if ok:
+        print("test_continent_labels_match_polygons passed")
+    else:
+        print("test_continent_labels_match_polygons failed")
+
+
+# Run all tests
+folder = tempfile.mkdtemp()
+try:
+    elevation_data = load_data(folder)
+    test_continent_labels_match_polygons(elevation_data)
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,120 @@
+import shutil
+import tempfile
+
+import numpy as np
+from shapely.geometry import Point
+
+from Class_FloodLevel import FloodLevel
+from synthetic_grid import format_refugees, load_data
+
+# Compare the areas read in the table of cumulative areas and the number of refugees of compute_refugees
+# with the point by point loop they replaced, on the synthetic grid of synthetic_grid.py.
+# Run this file from the folder of the project.
+
+
+def loop_area(elevation_data, elevation_low, elevation_high):
+    """
+    Area submerged on each continent between two sea levels, computed point by point like the original
+    version of compute_refugees: the points are grouped by elevation in a dictionary, every point of the levels
+    between the two sea levels is tested against the polygons of the continents and adds the area of its cell.
+    The flood level is computed with priority_flood, the inland depressions and the column at 180° are skipped.
+
+    Parameters
+    ----------
+    elevation_data : ElevationData
+    elevation_low : float
+        lowest elevation in meters (included)
+    elevation_high : float
+        highest elevation in meters (excluded)
+
+    Returns
+    -------
+    area : dict
+        associates the name of each continent to its submerged area in km squared
+    """
+    earth_radius = 6371.0088
+    lats, lons, z = elevation_data.elevation_cache.load()
+    elev = np.asarray(z, dtype=np.int32)
+    flood = FloodLevel.priority_flood(elev)
+    polygons = elevation_data.create_continent_polygons()
+
+    # { elevation → [[row, column], ...] }
+    elevation_dict = {}
+    for row in range(flood.shape[0]):
+        for col in range(flood.shape[1] - 1):   # the last column (180°) is the first one (-180°) again
+            if flood[row, col] > elev[row, col] and elev[row, col] < 0:
+                continue                        # bed of an inland depression
+            elevation_dict.setdefault(int(flood[row, col]), []).append([row, col])
+
+    area = {name: 0.0 for name in polygons}
+    for elev_level, list_points in elevation_dict.items():
+        if elev_level < elevation_high and elev_level >= elevation_low:
+            for row, col in list_points:
+                lat = lats[row]
+                point = Point(lons[col], lat)
+                south = np.radians(max(lat - 0.5, -90))
+                north = np.radians(min(lat + 0.5, 90))
+                surface = earth_radius ** 2 * np.radians(1.0) * (np.sin(north) - np.sin(south))
+                for name, polygon in polygons.items():
+                    if polygon.contains(point):
+                        area[name] += surface
+                        break
+    return area
+
+
+def loop_refugees(elevation_data, year, elevation_year, elevation_2022):
+    """
+    Total number of climatic refugees computed with the areas of loop_area.
+
+    Returns
+    -------
+    nb_refugees : float
+    """
+    nb_refugees = 32000000
+    if year > 2022:
+        area = loop_area(elevation_data, elevation_2022, elevation_year)
+        densities = elevation_data.population_densities([year])[0]
+        for density, name in zip(densities, elevation_data.continents):
+            nb_refugees += density * area[name]
+        nb_refugees += elevation_data.estimate_other_climatic_refugees(year)
+    return nb_refugees
+
+
+def test_submerged_area_matches_loop(elevation_data):
+    """
+    Test that the areas read in the table cumulative_area are the areas summed point by point.
+    """
+    ok = True
+    for elevation_low, elevation_high in [(0.21, 1.21), (0.21, 10.5), (-60, 0), (0.21, 50), (-10000, 10000)]:
+        area = elevation_data.submerged_area(elevation_low, elevation_high)
+        expected = loop_area(elevation_data, elevation_low, elevation_high)
+        expected = np.array([expected[name] for name in elevation_data.continents])
+        ok = ok and np.allclose(area, expected, rtol=1e-9, atol=1e-6)
+    if ok:
+        print("test_submerged_area_matches_loop passed")
+    else:
+        print("test_submerged_area_matches_loop failed")
+
+
+def test_compute_refugees_matches_loop(elevation_data):
+    """
+    Test that compute_refugees gives the number of refugees computed point by point.
+    """
+    ok = True
+    for year, elevation_year in [(2022, 0.21), (2030, 1.21), (2100, 10.5), (2600, 60.0)]:
+        result = elevation_data.compute_refugees(year, elevation_year, 0.21)
+        ok = ok and result == format_refugees(loop_refugees(elevation_data, year, elevation_year, 0.21))
+    if ok:
+        print("test_compute_refugees_matches_loop passed")
+    else:
+        print("test_compute_refugees_matches_loop failed")
+
+
+# Run all tests
+folder = tempfile.mkdtemp()
+try:
+    elevation_data = load_data(folder)
+    test_submerged_area_matches_loop(elevation_data)
+    test_compute_refugees_matches_loop(elevation_data)
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
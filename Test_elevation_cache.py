@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import time
+
+import netCDF4 as nc
+import numpy as np
+
+from Class_ElevationCache import ElevationCache
+from synthetic_grid import make_grid
+
+# Check that the binary cache of the .nc file is kept or rebuilt when the .nc file changes,
+# with the synthetic grid of synthetic_grid.py.
+
+
+def test_cache_invalidation(folder):
+    """
+    Test that the cache is kept when the .nc file is only touched, and rebuilt when its content changes.
+    """
+    path = os.path.join(folder, "invalidation.nc")
+    make_grid(path)
+    ElevationCache(path).load()
+
+    # Same content, new modification time: the cache is still valid
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    touched_valid = ElevationCache(path).is_valid()
+
+    # New content: the cache is rebuilt with the new elevations
+    time.sleep(0.01)
+    make_grid(path, shift=7)
+    changed_valid = ElevationCache(path).is_valid()
+    _, _, z = ElevationCache(path).load()
+    with nc.Dataset(path, 'r') as dataset:
+        expected = ElevationCache.to_int16(dataset.variables['z'][:])
+
+    if touched_valid and not changed_valid and np.array_equal(z, expected):
+        print("test_cache_invalidation passed")
+    else:
+        print("test_cache_invalidation failed")
+
+
+# Run all tests
+folder = tempfile.mkdtemp()
+try:
+    test_cache_invalidation(folder)
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
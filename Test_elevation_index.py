@@ -0,0 +1,47 @@
+import numpy as np
+
+from Class_ElevationIndex import ElevationIndex
+
+# Compare the queries of ElevationIndex (binary searches in the sorted elevations)
+# with a test of the elevation of every point of a random grid.
+
+rng = np.random.default_rng(0)
+elevations = rng.integers(-100, 100, (60, 120))
+index = ElevationIndex(elevations)
+
+
+def test_query_cells():
+    """
+    Test that query_cells returns all the points with low <= elevation < high, and only them.
+    """
+    ok = True
+    for low, high in [(-100, 100), (0.21, 1.21), (-5, 5), (10, 10), (20, -20), (-1000, -500)]:
+        cells = index.query_cells(low, high)
+        expected = np.flatnonzero((elevations >= low) & (elevations < high))
+        ok = ok and np.array_equal(np.sort(cells), expected) and index.count(low, high) == expected.size
+    if ok:
+        print("test_query_cells passed")
+    else:
+        print("test_query_cells failed")
+
+
+def test_level_bounds():
+    """
+    Test that level_bounds gives the levels of an interval, for one interval and for an array of intervals.
+    """
+    start, stop = index.level_bounds(-5, 5)
+    levels = index.levels[start:stop]
+    ok = np.array_equal(levels, np.arange(-5, 5))
+
+    highs = np.array([[0.5, 10.2], [-200, 300]])
+    start, stop = index.level_bounds(0.21, highs)
+    ok = ok and stop.shape == highs.shape and np.array_equal(index.levels[start:stop[0, 1]], np.arange(1, 11))
+    if ok:
+        print("test_level_bounds passed")
+    else:
+        print("test_level_bounds failed")
+
+
+# Run all tests
+test_query_cells()
+test_level_bounds()
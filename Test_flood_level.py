@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+
+import numpy as np
+
+from Class_FloodLevel import FloodLevel
+from synthetic_grid import load_data
+
+# Compare the flood levels computed by FloodLevel.compute with the priority-flood in python, and check that
+# the beds of the inland depressions are not counted in the submerged areas, on the synthetic grid of synthetic_grid.py.
+# Run this file from the folder of the project.
+
+
+def test_flood_level_matches_priority_flood(elevation_data):
+    """
+    Test that FloodLevel.compute gives the same flood levels as the priority-flood in python,
+    on the synthetic grid and on random grids with depressions across the border in longitude.
+    """
+    _, _, z = elevation_data.elevation_cache.load()
+    grids = [np.asarray(z, dtype=np.int32)]
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        grids.append(rng.integers(-50, 50, (40, 60)))
+
+    same = all(np.array_equal(FloodLevel.compute(grid), FloodLevel.priority_flood(grid)) for grid in grids)
+    # The depression along the 180° meridian is reached through the first column
+    flooded_seam = int(FloodLevel.compute(grids[0])[65, 358]) == -50
+    if same and flooded_seam:
+        print("test_flood_level_matches_priority_flood passed")
+    else:
+        print("test_flood_level_matches_priority_flood failed")
+
+
+def test_inland_depression_not_counted(elevation_data):
+    """
+    Test that the bed of the inland depression is not counted, even for a sea level above the ridge around it.
+    """
+    # The depression is flooded when the sea reaches the top of the ridge (500 m): at this level
+    # only the points of the ridge (all the points of the square but the depression) are submerged
+    ridge = np.zeros(elevation_data.grid_shape, dtype=bool)
+    ridge[95:106, 235:246] = True
+    ridge[97:104, 237:244] = False
+    expected = (elevation_data.cell_area[:, None] * ridge).sum()
+
+    area = elevation_data.submerged_area(500, 501)
+    basins = elevation_data.flood_level.basins[97:104, 237:244]
+    if np.all(basins) and np.isclose(area.sum(), expected):
+        print("test_inland_depression_not_counted passed")
+    else:
+        print("test_inland_depression_not_counted failed")
+
+
+# Run all tests
+folder = tempfile.mkdtemp()
+try:
+    elevation_data = load_data(folder)
+    test_flood_level_matches_priority_flood(elevation_data)
+    test_inland_depression_not_counted(elevation_data)
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
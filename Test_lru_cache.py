@@ -0,0 +1,66 @@
+import random
+import sys
+import threading
+
+from Class_LRUCache import LRUCache
+
+# Check the removal of the least recently used objects of LRUCache, and its use from several threads.
+
+
+def test_lru_eviction():
+    """
+    Test that the least recently used objects are removed first when the cache is full,
+    and that an object larger than the cache is not stored.
+    """
+    cache = LRUCache(100)
+    cache.put('a', 1, 40)
+    cache.put('b', 2, 40)
+    cache.get('a')              # 'b' is now the least recently used
+    cache.put('c', 3, 40)
+    cache.put('d', 4, 200)      # too large
+    if 'a' in cache and 'b' not in cache and 'c' in cache and 'd' not in cache and cache.nb_bytes == 80 \
+            and cache.evictions == 1:
+        print("test_lru_eviction passed")
+    else:
+        print("test_lru_eviction failed")
+
+
+def test_lru_threads():
+    """
+    Test that the cache stays consistent when several threads store and read objects at the same time
+    (like the thread of the interface and the threads rendering the maps in the background).
+    """
+    cache = LRUCache(1000)
+    errors = []
+
+    def use_cache(seed):
+        generator = random.Random(seed)
+        try:
+            for _ in range(20000):
+                key = generator.randrange(100)
+                if generator.random() < 0.5:
+                    cache.put(key, key, generator.randrange(1, 60))
+                else:
+                    cache.get(key)
+        except Exception as error:
+            errors.append(error)
+
+    # Switch between the threads very often, so that they interrupt each other inside the operations
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=use_cache, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sys.setswitchinterval(switch_interval)
+
+    if not errors and cache.nb_bytes == sum(size for _, size in cache.items.values()) and cache.nb_bytes <= 1000:
+        print("test_lru_threads passed")
+    else:
+        print("test_lru_threads failed")
+
+
+# Run all tests
+test_lru_eviction()
+test_lru_threads()
@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+
+import numpy as np
+
+from Class_SeaLevel import SeaLevel
+from synthetic_grid import format_refugees, load_data
+
+# Check the projection of the refugees for all the years and scenarios, on the synthetic grid of synthetic_grid.py.
+# Run this file from the folder of the project (SeaLevel reads Sea_level_rise.csv from the current folder).
+
+
+def test_project_refugees_matches_compute_refugees(elevation_data):
+    """
+    Test that project_refugees gives, for every year and scenario, the number of refugees of compute_refugees.
+    """
+    sea_level = SeaLevel()
+    years = np.arange(2000, 2601, 25)
+    scenarios = [1, 2, 3, 4]
+    _, total = elevation_data.project_refugees(years, scenarios, sea_level, 0.21)
+
+    ok = True
+    for i, year in enumerate(years):
+        for j, scenario in enumerate(scenarios):
+            level = sea_level.retrieve_sea_level(int(year), scenario)
+            ok = ok and format_refugees(total[i, j]) == elevation_data.compute_refugees(int(year), level, 0.21)
+    if ok:
+        print("test_project_refugees_matches_compute_refugees passed")
+    else:
+        print("test_project_refugees_matches_compute_refugees failed")
+
+
+def test_project_refugees_per_continent(elevation_data):
+    """
+    Test that the refugees of each continent are the area submerged on the continent since 2022 multiplied by
+    its population density, and that there is no refugee due to the sea level rise until 2022.
+    """
+    sea_level = SeaLevel()
+    years = np.array([2000, 2022, 2050, 2300])
+    refugees, _ = elevation_data.project_refugees(years, [2], sea_level, 0.21)
+
+    densities = elevation_data.population_densities(years)
+    ok = np.all(refugees[:2] == 0)
+    for i in (2, 3):
+        area = elevation_data.submerged_area(0.21, sea_level.retrieve_sea_level(int(years[i]), 2))
+        ok = ok and np.allclose(refugees[i, 0], densities[i] * area, rtol=1e-12)
+    if ok:
+        print("test_project_refugees_per_continent passed")
+    else:
+        print("test_project_refugees_per_continent failed")
+
+
+# Run all tests
+folder = tempfile.mkdtemp()
+try:
+    elevation_data = load_data(folder)
+    test_project_refugees_matches_compute_refugees(elevation_data)
+    test_project_refugees_per_continent(elevation_data)
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,147 @@
+"""
+Render the maps of every year and IPCC scenario to PNG files, without the interface.
+
+Example (all the years from 1950 to 2445 for the 4 scenarios, in 2 sizes):
+    python batch_render.py --sizes 800x600 1600x800 --output frames
+
+The .nc file is decoded once into its binary cache (see ElevationCache) before the workers start:
+each worker process only memory-maps the cache, so the elevation grid is shared read-only
+by all the processes through the page cache of the system instead of being loaded by each of them.
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from Class_ElevationCache import ElevationCache
+from Class_FloodLevel import FloodLevel
+from Class_MapRenderer import MapRenderer
+from Class_SeaLevel import SeaLevel
+
+renderer = None   # MapRenderer of the worker process, set by init_worker
+
+
+def init_worker(netcdf_file):
+    """
+    Create the renderer of a worker process from the binary cache of the .nc file (memory-mapped).
+
+    Parameters
+    ----------
+    netcdf_file : str
+        name of the .nc elevation file
+
+    Returns
+    -------
+    None.
+    """
+    global renderer
+    renderer = MapRenderer(ElevationCache(netcdf_file))
+    renderer.flood_level.load()
+
+
+def render_frames(width, height, frames, output):
+    """
+    Render maps of the same size in a worker process and save them as PNG files.
+    The index image of the map is built once for each window of elevations (see MapRenderer.palette_base),
+    then each frame only needs its palette.
+
+    Parameters
+    ----------
+    width, height : int
+        size of the maps in pixels
+    frames : list
+        (year, scenario, sea level) of each map
+    output : str
+        folder of the PNG files
+
+    Returns
+    -------
+    int
+        number of maps saved
+    """
+    _, _, lat_indices, lon_indices = renderer.grid_indices(width, height)
+    index_images = {}   # base of the palette → index image
+
+    for year, scenario, sea_level in frames:
+        base = renderer.palette_base(sea_level)
+        if base not in index_images:
+            index_images[base] = renderer.map_index_image(lat_indices, lon_indices, base)
+
+        image = index_images[base].copy()
+        image.putpalette(renderer.palette(sea_level, base))
+        image.save(os.path.join(output, f"map_{width}x{height}_scenario{scenario}_{year}.png"))
+    return len(frames)
+
+
+def parse_size(text):
+    """
+    Convert a size written 'widthxheight' (for example '800x600') into a pair of ints.
+    """
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def positive_int(text):
+    """
+    Convert a number of processes into an int, refusing 0 and negative numbers.
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{text} is not a positive number")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the maps of every year and scenario to PNG files.")
+    parser.add_argument("--netcdf", default="ETOPO_2022_v1_60s_N90W180_bed.nc", help="elevation file")
+    parser.add_argument("--first-year", type=int, default=1950)
+    parser.add_argument("--last-year", type=int, default=2445)
+    parser.add_argument("--step", type=int, default=5, help="number of years between two maps")
+    parser.add_argument("--scenarios", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(800, 600)], help="sizes written 800x600")
+    parser.add_argument("--output", default="frames", help="folder of the PNG files")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1, help="number of processes")
+    args = parser.parse_args()
+
+    # Show the messages of the caches built the first time (elevation cache, flood levels)
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(message)s")
+
+    os.makedirs(args.output, exist_ok=True)
+
+    # Build the binary cache and the flood levels once, before the workers map them
+    elevation_cache = ElevationCache(args.netcdf)
+    elevation_cache.load()
+    FloodLevel(elevation_cache).load()
+
+    # Sea level of each (year, scenario)
+    sea_level = SeaLevel()
+    years = np.arange(args.first_year, args.last_year + 1, args.step)
+    frames = [(int(year), scenario, float(level))
+              for scenario in args.scenarios
+              for year, level in zip(years, sea_level.sea_levels(years, scenario))]
+
+    # Split the frames of each size in one group per worker, sorted by sea level so that
+    # the frames of a group mostly share the same index image
+    frames.sort(key=lambda frame: frame[2])
+    tasks = [(width, height, frames[start::args.workers])
+             for width, height in args.sizes
+             for start in range(min(args.workers, len(frames)))]
+
+    nb_frames = 0
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(args.netcdf,)) as executor:
+        futures = [executor.submit(render_frames, width, height, group, args.output) for width, height, group in tasks]
+        for future in as_completed(futures):
+            nb_frames += future.result()
+            elapsed = time.perf_counter() - start_time
+            print(f"[BATCH] {nb_frames} maps rendered, {nb_frames / elapsed:.1f} frames per second")
+
+    elapsed = time.perf_counter() - start_time
+    print(f"[BATCH] {nb_frames} maps in {elapsed:.1f} s ({nb_frames / elapsed:.1f} frames per second) saved in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+
+import netCDF4 as nc
+import numpy as np
+
+from Class_ElevationData import ElevationData
+
+# Small synthetic elevation grid of 1 degree shared by the test scripts of the vectorised computations
+# (flood levels, cumulative areas, refugees...), written as a .nc file in a temporary folder.
+
+
+def make_grid(path, seed=0, shift=0):
+    """
+    Write a synthetic .nc elevation file of 1 degree from -90° to 90° and from -180° to 180° (both included):
+    a deep ocean in the western hemisphere, a low land with random elevations around a few meters in the
+    eastern hemisphere, an inland depression below sea level (surrounded by a ridge) and a depression which
+    only reaches the ocean across the 180° meridian.
+
+    Parameters
+    ----------
+    path : str
+        name of the .nc file to write
+    seed : int
+        seed of the random elevations
+    shift : int
+        added to all the elevations (to write a file with another content)
+
+    Returns
+    -------
+    None.
+    """
+    rng = np.random.default_rng(seed)
+    lats = np.linspace(-90, 90, 181)
+    lons = np.linspace(-180, 180, 361)
+
+    z = rng.normal(5, 20, (len(lats), len(lons)))
+    z[:, :180] -= 3000                      # ocean in the western hemisphere
+    z[20, 90] = -9000                       # deepest trench
+
+    z[95:106, 235:246] = 500                # ridge around an inland depression (lon 55° to 65°, lat 5° to 15°)
+    z[97:104, 237:244] = -30
+
+    z[60:70, 355:361] = -50                 # depression along 175° to 180°, connected to the ocean by the seam
+    z[60:70, 0] = -50
+
+    with nc.Dataset(path, 'w') as dataset:
+        dataset.createDimension('lat', len(lats))
+        dataset.createDimension('lon', len(lons))
+        dataset.createVariable('lat', 'f8', ('lat',))[:] = lats
+        dataset.createVariable('lon', 'f8', ('lon',))[:] = lons
+        dataset.createVariable('z', 'f4', ('lat', 'lon'), chunksizes=(32, 64), zlib=True)[:] = z + shift
+
+
+def load_data(folder, step=1):
+    """
+    Create the synthetic grid in a folder and load it with ElevationData.
+
+    Parameters
+    ----------
+    folder : str
+        temporary folder of the .nc file and of its cache
+    step : int
+        only one point every step points of the grid is kept (all the points by default)
+
+    Returns
+    -------
+    elevation_data : ElevationData
+    """
+    path = os.path.join(folder, "synthetic.nc")
+    if not os.path.exists(path):
+        make_grid(path)
+    return ElevationData(path, None, "fr_mainland_contour.csv", step=step)
+
+
+def format_refugees(nb_refugees):
+    """
+    Format a number of refugees like ElevationData.compute_refugees, to compare a number computed by a test
+    with its result.
+    """
+    if nb_refugees > 1000000000:
+        return f'{round(nb_refugees / 1000000000, 3)} billion'
+    return f'{round(nb_refugees / 1000000, 3)} million'